@@ -14,12 +14,17 @@ import os  # the os module is used for file and directory operations
 
 from tetromino import Tetromino  # this class is for modeling the tetrominoes
 from game_grid import GameGrid  # this class is for modeling the game grid
+from engine import Game, create_piece  # the rendering-free game rules
+from replay import Replay, CHECKPOINT_INTERVAL  # for recording the game
+from archive import Archive  # for storing the finished games
+from bot import BeamSearchBot  # for letting the computer play
+import random
+import sys
 import time
-import random  # random was used for creating tetrominoes with random shapes
 
 
 
-def start(speed=None):
+def start(speed=None, seed=None, bot=None):
     # set the dimensions of the game grid
     grid_h, grid_w = 20, 12
 
@@ -39,91 +44,77 @@ def start(speed=None):
     if speed is None:
         speed = display_game_menu(grid_h, grid_w)
 
+    # the tetrominoes are created with a random number generator seeded with
+    # the seed of the game, which is stored in the replay with the inputs
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    replay = Replay(seed, grid_h, grid_w)
+
+    # create the game that applies the user inputs and the falling of the
+    # tetrominoes to the grid (see the Game class in the engine module)
+    game = Game(grid, lambda: create_tetromino(rng))
+    lastfalltime = time.time()
+    # the number of the last tetromino moved by the bot (if any)
+    bot_piece = 0
+
+    # the main game loop
     while True:
-        lastfalltime = time.time()
-        current_tetromino = create_tetromino()
-        grid.current_tetromino = current_tetromino
-        paused = False
-
-        # create the first tetromino to enter the game grid
-
-        # by using the create_tetromino function defined below
-
-        # display a simple menu before opening the game
-        # by using the display_game_menu function defined below
-
-        # the main game loop
-        while True:
-
-            # check for any user interaction via the keyboard
-            if stddraw.hasNextKeyTyped():  # check if the user has pressed a key
-                key_typed = stddraw.nextKeyTyped()  # the most recently pressed key
-                # if the left arrow key has been pressed
-                if key_typed == 'p':
-                    paused = not paused
-
-                if not paused:
-                    if key_typed == "left":
-                        # move the active tetromino left by one
-                        current_tetromino.move(key_typed, grid)
-                    # if the right arrow key has been pressed
-                    elif key_typed == "right":
-                        # move the active tetromino right by one
-                        current_tetromino.move(key_typed, grid)
-                    # if the down arrow key has been pressed
-                    elif key_typed == "down":
-                        # move the active tetromino down by one
-                        # (soft drop: causes the tetromino to fall down faster)
-                        current_tetromino.move(key_typed, grid)
-                    elif key_typed == 'up':  # Assuming 'up' arrow is for rotation
-                        current_tetromino.rotate(grid)
-                    elif key_typed == 's':
-                        while current_tetromino.move("down",
-                                                     grid):  # Move the tetromino down until it can't move further
-                            pass
-
-                # clear the queue of the pressed keys for a smoother interaction
-                stddraw.clearKeysTyped()
-                labels = grid.label_components()
-                grid.move_down_components(labels)
-
-            if not paused:
-
-                current_time = time.time()
-                if (current_time - lastfalltime) * 1000 >= speed:
-                    success = current_tetromino.move("down", grid)
-                    grid.merge_tiles()
-                    lastfalltime = current_time
-
-                    if not success:
-                        tiles, pos = current_tetromino.get_min_bounded_tile_matrix(True)
-                        game_over = grid.update_grid(tiles, pos)
-                        if game_over:
-                            stddraw.clear()  # Clear the canvas
-
-                            stddraw.setPenColor(stddraw.VIOLET)
-                            stddraw.filledRectangle(0, 0, grid_w, grid_h)
-
-                            stddraw.setFontSize(40)
-                            stddraw.setPenColor(stddraw.BLACK)
-                            stddraw.text(grid_w / 2, grid_h / 2, "Game Over")
-                            speed = restart_button_display(grid_h, grid_w)  # Capture fall speed from restart
-
-                            stddraw.show()
-
-                            return speed  # end the game loop
-
-                        current_tetromino = create_tetromino()
-                        grid.current_tetromino = current_tetromino
-
-                    grid.display()
-
-                    if grid.check_win():
-                        grid.draw_game_won()
-            else:
-                # Display a pause screen or simply do nothing
-                stddraw.text(canvas_w / 2, canvas_h / 2, "Game Paused")
-                stddraw.show(100)  # Update the display to show the paused message
+
+        # check for any user interaction via the keyboard
+        if stddraw.hasNextKeyTyped():  # check if the user has pressed a key
+            key_typed = stddraw.nextKeyTyped()  # the most recently pressed key
+            # 'p' pauses the game, the arrow keys move and rotate the active
+            # tetromino and 's' drops it (hard drop)
+            replay.record(key_typed)
+            game.handle_key(key_typed)
+            # clear the queue of the pressed keys for a smoother interaction
+            stddraw.clearKeysTyped()
+
+        # the bot moves each new tetromino to the placement that it chooses
+        if bot is not None and not game.paused and game.pieces != bot_piece:
+            for key in bot.keys(grid, game.current_tetromino):
+                replay.record(key)
+                game.handle_key(key)
+            bot_piece = game.pieces
+
+        if not game.paused:
+
+            current_time = time.time()
+            if (current_time - lastfalltime) * 1000 >= speed:
+                replay.record("fall")
+                game_over = game.fall()
+                lastfalltime = current_time
+
+                if game_over:
+                    save_replay(replay, grid.score)
+                    stddraw.clear()  # Clear the canvas
+
+                    stddraw.setPenColor(stddraw.VIOLET)
+                    stddraw.filledRectangle(0, 0, grid_w, grid_h)
+
+                    stddraw.setFontSize(40)
+                    stddraw.setPenColor(stddraw.BLACK)
+                    stddraw.text(grid_w / 2, grid_h / 2, "Game Over")
+                    speed = restart_button_display(grid_h, grid_w)  # Capture fall speed from restart
+
+                    stddraw.show()
+
+                    return speed  # end the game loop
+
+                # save a snapshot of the game for seeking in the replay
+                if replay.ticks % CHECKPOINT_INTERVAL == 0:
+                    replay.checkpoint(game, rng)
+
+                grid.display()
+
+                if grid.check_win():
+                    grid.draw_game_won()
+                    replay.record("restart")
+        else:
+            # Display a pause screen or simply do nothing
+            stddraw.text(canvas_w / 2, canvas_h / 2, "Game Paused")
+            stddraw.show(100)  # Update the display to show the paused message
 
 
 def restart_button_display(grid_h, grid_w):
@@ -154,14 +145,19 @@ def restart_button_display(grid_h, grid_w):
                 return display_game_menu(grid_h, grid_w)
 
 
-def create_tetromino():
+def create_tetromino(rng=random):
     # the type (shape) of the tetromino is determined randomly
-    tetromino_types = ['L', 'Z', 'O', '.', 'T', 'I', 'J', 'S']
-    random_index = random.randint(0, len(tetromino_types) - 1)
-    random_type = tetromino_types[random_index]
-    # create and return the tetromino
-    tetromino = Tetromino(random_type)
-    return tetromino
+    return create_piece(Tetromino, rng)
+
+
+# Saves the replay of a finished game in the replays folder (see the replay
+# module for re-simulating it) and appends it to the archive of all the games
+def save_replay(replay, score):
+    current_dir = os.path.dirname(os.path.realpath(__file__))
+    replay_dir = os.path.join(current_dir, "replays")
+    os.makedirs(replay_dir, exist_ok=True)
+    replay.save(os.path.join(replay_dir, "game_%d.t2r" % replay.seed))
+    Archive(os.path.join(replay_dir, "games.t2a")).append(replay, score)
 
 
 def display_game_menu(grid_height, grid_width):
@@ -231,8 +227,10 @@ def display_game_menu(grid_height, grid_width):
 
 if __name__ == '__main__':
     speed = None  # Initialize with None or a default value
+    # the computer plays the game when the --bot option is given
+    bot = BeamSearchBot() if "--bot" in sys.argv[1:] else None
     while True:
-        speed = start(speed)  # Pass the current speed to start
+        speed = start(speed, bot=bot)  # Pass the current speed to start
         if speed == "exit":
             print("Exiting the game.")
             break
@@ -0,0 +1,111 @@
+################################################################################
+#                                                                              #
+# An append-only archive of finished games. The replays of the games (see the  #
+# replay module) are stored back to back in one data file, and a fixed-width   #
+# record per game is appended to an index file next to it (with the ".idx"     #
+# suffix). The index is read with np.memmap, so that the games can be filtered #
+# by score or length and their replays read without loading the whole archive. #
+#                                                                              #
+# Index file format: the magic bytes b"T2A1" padded to 16 bytes, followed by   #
+# the records (see INDEX_DTYPE). A record is appended only after its replay,   #
+# so an interrupted write never leaves a record without its replay.            #
+#                                                                              #
+# Usage: python archive.py games.t2a [min_score]                               #
+#                                                                              #
+################################################################################
+
+import os  # for checking the sizes of the archive files
+import sys  # for the command line arguments
+import numpy as np  # the fundamental Python module for scientific computing
+from replay import Replay
+
+INDEX_MAGIC = b"T2A1"
+INDEX_HEADER_SIZE = 16
+# the record of a game in the index: its id (its position in the archive), the
+# seed, the final score, the length in fall ticks and the position and the size
+# of its replay in the data file
+INDEX_DTYPE = np.dtype([("game_id", "<u8"), ("seed", "<u8"), ("score", "<i8"),
+                        ("length", "<u4"), ("size", "<u4"), ("offset", "<u8")])
+
+
+# A class for appending games to an archive and for reading them back
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        if not os.path.exists(self.index_path):
+            with open(self.index_path, "wb") as file:
+                file.write(INDEX_MAGIC.ljust(INDEX_HEADER_SIZE, b"\0"))
+            open(self.path, "ab").close()
+        with open(self.index_path, "rb") as file:
+            if file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError("not a Tetris 2048 archive index")
+
+    # Returns the number of games in the archive
+    def __len__(self):
+        return (os.path.getsize(self.index_path) - INDEX_HEADER_SIZE) // INDEX_DTYPE.itemsize
+
+    # Appends the replay of a finished game with its final score and returns
+    # the id of the game
+    def append(self, replay, score):
+        data = replay.to_bytes()
+        with open(self.path, "ab") as file:
+            offset = file.tell()
+            file.write(data)
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        game_id = len(self)
+        record[0] = game_id, replay.seed, score, replay.ticks, len(data), offset
+        with open(self.index_path, "ab") as file:
+            file.write(record.tobytes())
+        return game_id
+
+    # Returns the records of all the games as a read-only memory-mapped array
+    def index(self):
+        if not len(self):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r",
+                         offset=INDEX_HEADER_SIZE, shape=(len(self),))
+
+    # Returns the records of the games with a score and a length (in fall
+    # ticks) within the given bounds
+    def select(self, min_score=None, max_score=None, min_length=None, max_length=None):
+        index = self.index()
+        selected = np.ones(len(index), dtype=bool)
+        if min_score is not None:
+            selected &= index["score"] >= min_score
+        if max_score is not None:
+            selected &= index["score"] <= max_score
+        if min_length is not None:
+            selected &= index["length"] >= min_length
+        if max_length is not None:
+            selected &= index["length"] <= max_length
+        return index[selected]
+
+    # Yields the replays of the given records (all the games by default), read
+    # one by one from the memory-mapped data file
+    def replays(self, records=None):
+        if records is None:
+            records = self.index()
+        if not len(records):
+            return
+        data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        for record in records:
+            offset, size = int(record["offset"]), int(record["size"])
+            yield Replay.from_bytes(data[offset:offset + size].tobytes())
+
+    # Returns the replay of the game with the given id
+    def read(self, game_id):
+        return next(self.replays(self.index()[game_id:game_id + 1]))
+
+
+def main(argv):
+    archive = Archive(argv[1])
+    records = archive.select(min_score=int(argv[2]) if len(argv) > 2 else None)
+    print("%d games, %d selected" % (len(archive), len(records)))
+    if len(records):
+        print("score:  mean %.1f  max %d" % (records["score"].mean(), records["score"].max()))
+        print("length: mean %.1f ticks" % records["length"].mean())
+
+
+if __name__ == '__main__':
+    main(sys.argv)
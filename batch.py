@@ -0,0 +1,257 @@
+################################################################################
+#                                                                              #
+# A batch of Tetris 2048 games that are simulated together. The grids of all   #
+# the games are stored in one (n_boards, grid_h, grid_w) array of tile         #
+# exponents and every step (moving, rotating, dropping, locking, merging,      #
+# clearing rows and moving the floating tiles down) is applied to all of them  #
+# with NumPy operations, following the rules of the Board, Piece and Game      #
+# classes in the engine module.                                                #
+#                                                                              #
+################################################################################
+
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import SPAWN_TYPES, ORIENTATIONS, WINNING_EXPONENT, merge_columns, clear_full_rows
+
+# the keys that can be applied to the games of a batch, indexed by the action
+# codes passed to BatchGame.apply_keys (NO_KEY applies no key at all)
+KEYS = [None, "left", "right", "down", "up", "s"]
+NO_KEY, LEFT, RIGHT, DOWN, ROTATE, DROP = range(len(KEYS))
+# the index of the 'O' tetromino, which is never rotated
+O_TYPE = SPAWN_TYPES.index('O')
+
+
+# Builds the cell offsets of every rotation state of every type of tetromino in
+# SPAWN_TYPES (padded to 4 cells) as arrays indexed by [type, rotation, cell],
+# and the cells of the n x n tile matrix of every type (padded to 4 x 4) that
+# must be free for a rotation
+def _build_tables():
+    n_types = len(SPAWN_TYPES)
+    sizes = np.zeros(n_types, dtype=np.int64)
+    cell_dx = np.zeros((n_types, 4, 4), dtype=np.int64)
+    cell_dy = np.zeros((n_types, 4, 4), dtype=np.int64)
+    cell_valid = np.zeros((n_types, 4), dtype=bool)
+    box_valid = np.zeros((n_types, 16), dtype=bool)
+    for t, shape in enumerate(SPAWN_TYPES):
+        n = ORIENTATIONS[shape][0].n
+        sizes[t] = n
+        for r, orientation in enumerate(ORIENTATIONS[shape]):
+            for k, (row, col) in enumerate(orientation.cells):
+                cell_dx[t, r, k] = col
+                cell_dy[t, r, k] = (n - 1) - row
+                cell_valid[t, k] = True
+        box_valid[t] = [i < n and j < n for i in range(4) for j in range(4)]
+    box_dy = np.repeat(np.arange(4), 4)
+    box_dx = np.tile(np.arange(4), 4)
+    return sizes, cell_dx, cell_dy, cell_valid, box_valid, box_dx, box_dy
+
+
+_SIZES, _CELL_DX, _CELL_DY, _CELL_VALID, _BOX_VALID, _BOX_DX, _BOX_DY = _build_tables()
+
+
+# A class for simulating many games of Tetris 2048 at once. The state of game i
+# is boards[i] (the tile exponents, 0 for an empty cell), scores[i], the
+# doubled/quadrupled flags and the falling tetromino given by piece_type[i]
+# (an index into SPAWN_TYPES), rotation[i], the position x[i], y[i] of its
+# bottom left cell and the exponents of its tiles minos[i]. Games that are over
+# are left unchanged by the later steps.
+class BatchGame:
+    def __init__(self, n_boards, grid_h=20, grid_w=12, seed=None):
+        self.n_boards = n_boards
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((n_boards, grid_h, grid_w), dtype=np.uint8)
+        self.scores = np.zeros(n_boards, dtype=np.int64)
+        self.doubled = np.zeros(n_boards, dtype=bool)
+        self.quadrupled = np.zeros(n_boards, dtype=bool)
+        self.game_over = np.zeros(n_boards, dtype=bool)
+        self.game_won = np.zeros(n_boards, dtype=bool)
+        # the number of fall ticks and of tetrominoes of each game so far
+        self.ticks = np.zeros(n_boards, dtype=np.int64)
+        self.pieces = np.zeros(n_boards, dtype=np.int64)
+        self.piece_type = np.zeros(n_boards, dtype=np.int64)
+        self.rotation = np.zeros(n_boards, dtype=np.int64)
+        self.x = np.zeros(n_boards, dtype=np.int64)
+        self.y = np.zeros(n_boards, dtype=np.int64)
+        self.minos = np.zeros((n_boards, 4), dtype=np.uint8)
+        self.spawn(np.ones(n_boards, dtype=bool))
+
+    # Starts new games in place of the games in the given mask (all of them by
+    # default)
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.n_boards, dtype=bool)
+        self.boards[mask] = 0
+        for values in (self.scores, self.doubled, self.quadrupled, self.game_over,
+                       self.game_won, self.ticks, self.pieces):
+            values[mask] = 0
+        self.spawn(mask)
+
+    # Creates a new tetromino of a random type for every game in the given mask
+    # (the same choices as create_piece and Piece, drawn from self.rng)
+    def spawn(self, mask):
+        idx = np.flatnonzero(mask)
+        types = self.rng.integers(0, len(SPAWN_TYPES), size=len(idx))
+        self.piece_type[idx] = types
+        self.rotation[idx] = 0
+        self.minos[idx] = self.rng.integers(1, 3, size=(len(idx), 4)) * _CELL_VALID[types]
+        self.x[idx] = self.rng.integers(0, self.grid_width - _SIZES[types] + 1)
+        self.y[idx] = self.grid_height - 1
+        self.pieces[idx] += 1
+
+    # Applies one key per game (an action code from KEYS) like Game.handle_key
+    # and then moves the floating tiles down in every game where a key was
+    # applied
+    def apply_keys(self, actions):
+        actions = np.where(self.game_over, NO_KEY, np.asarray(actions))
+        for code, dx, dy in ((LEFT, -1, 0), (RIGHT, 1, 0), (DOWN, 0, -1)):
+            idx = np.flatnonzero(actions == code)
+            if len(idx):
+                moved = idx[self._fits(idx, self.x[idx] + dx, self.y[idx] + dy)]
+                self.x[moved] += dx
+                self.y[moved] += dy
+        idx = np.flatnonzero((actions == ROTATE) & (self.piece_type != O_TYPE))
+        if len(idx):
+            rotated = idx[self._box_fits(idx)]
+            self.rotation[rotated] = (self.rotation[rotated] + 1) % 4
+        idx = np.flatnonzero(actions == DROP)
+        while len(idx):
+            idx = idx[self._fits(idx, self.x[idx], self.y[idx] - 1)]
+            self.y[idx] -= 1
+        self.move_down_floating(actions != NO_KEY)
+
+    # Moves the tetrominoes down by one, merges the tiles and locks the landed
+    # tetrominoes like Game.fall, in every game that is not over
+    def fall(self):
+        idx = np.flatnonzero(~self.game_over)
+        fits = self._fits(idx, self.x[idx], self.y[idx] - 1)
+        self.y[idx[fits]] -= 1
+        self.merge(idx)
+        landed = idx[~fits]
+        self.lock(landed)
+        spawning = np.zeros(self.n_boards, dtype=bool)
+        spawning[landed] = True
+        self.spawn(spawning & ~self.game_over)
+        self.ticks[idx] += 1
+
+    # Applies the given keys (if any) and then one fall tick to every game
+    def step(self, actions=None):
+        if actions is not None:
+            self.apply_keys(actions)
+        self.fall()
+
+    # Returns the grid positions of the cells of the tetrominoes of the given
+    # games placed at the given positions, and a mask of the padding cells
+    def _cells(self, idx, xs, ys, rotations=None):
+        types = self.piece_type[idx]
+        if rotations is None:
+            rotations = self.rotation[idx]
+        cols = xs[:, None] + _CELL_DX[types, rotations]
+        rows = ys[:, None] + _CELL_DY[types, rotations]
+        return rows, cols, _CELL_VALID[types]
+
+    # Returns which tetrominoes of the given games fit at the given positions
+    # (the same checks as Piece.can_be_moved for the left, right and down moves)
+    def _fits(self, idx, xs, ys):
+        rows, cols, valid = self._cells(idx, xs, ys)
+        inside = (cols >= 0) & (cols < self.grid_width) & (rows >= 0)
+        in_grid = inside & (rows < self.grid_height)
+        cells = self.boards[idx[:, None], np.clip(rows, 0, self.grid_height - 1),
+                            np.clip(cols, 0, self.grid_width - 1)]
+        blocked = valid & (~inside | (in_grid & (cells != 0)))
+        return ~blocked.any(axis=1)
+
+    # Returns which tetrominoes of the given games can rotate (the whole n x n
+    # tile matrix must be inside the grid and empty, as in Piece.can_be_moved)
+    def _box_fits(self, idx):
+        n = _SIZES[self.piece_type[idx]]
+        xs, ys = self.x[idx], self.y[idx]
+        inside = (xs >= 0) & (xs + n <= self.grid_width) & (ys >= 0) & (ys + n <= self.grid_height)
+        rows = np.clip(ys[:, None] + _BOX_DY, 0, self.grid_height - 1)
+        cols = np.clip(xs[:, None] + _BOX_DX, 0, self.grid_width - 1)
+        cells = self.boards[idx[:, None], rows, cols]
+        return inside & ~(_BOX_VALID[self.piece_type[idx]] & (cells != 0)).any(axis=1)
+
+    # Merges the tiles of the given games (see merge_columns) and updates their
+    # scores and tile values like Board.merge_tiles and Board.update_score
+    def merge(self, idx):
+        boards = self.boards[idx]
+        merged, merges = merge_columns(boards)
+        if not merges.any():
+            return
+        # the merged exponents in the order in which merge_tiles scores them:
+        # column by column, from the bottom up
+        exponents = np.where(merges, boards[:, :-1, :].astype(np.int64) + 1, 0)
+        exponents = exponents.transpose(0, 2, 1).reshape(len(idx), -1)
+        has_merge = exponents > 0
+        points = np.where(has_merge, np.left_shift(1, exponents), 0)
+        positions = np.arange(points.shape[1])
+        no_event = points.shape[1]
+        scores, doubled, quadrupled = self.scores[idx], self.doubled[idx], self.quadrupled[idx]
+        # the tiles are doubled by the first merge that takes the score to 200,
+        # and the points of the later merges are doubled as well
+        running = scores[:, None] + np.cumsum(points, axis=1)
+        hits = has_merge & (running >= 200) & ~doubled[:, None]
+        first = np.where(hits.any(axis=1), np.argmax(hits, axis=1), no_event)
+        multipliers = np.where(positions > first[:, None], 2, 1)
+        # they are doubled again at 16000, by a later merge than the first
+        # doubling (the elif branch of update_score)
+        running = scores[:, None] + np.cumsum(points * multipliers, axis=1)
+        eligible = doubled[:, None] | (positions > first[:, None])
+        hits = has_merge & (running >= 16000) & ~quadrupled[:, None] & eligible
+        second = np.where(hits.any(axis=1), np.argmax(hits, axis=1), no_event)
+        multipliers = multipliers * np.where(positions > second[:, None], 2, 1)
+        doublings = (first < no_event).astype(np.uint8) + (second < no_event)
+        merged += np.where(merged != 0, doublings[:, None, None], 0).astype(np.uint8)
+        self.boards[idx] = merged
+        self.scores[idx] = scores + (points * multipliers).sum(axis=1)
+        self.doubled[idx] = doubled | (first < no_event)
+        self.quadrupled[idx] = quadrupled | (second < no_event)
+        self.game_won[idx] |= (merged == WINNING_EXPONENT).any(axis=(1, 2))
+
+    # Locks the tetrominoes of the given games on their grids like
+    # Board.update_grid (a tile above the grid ends the game)
+    def lock(self, idx):
+        if not len(idx):
+            return
+        rows, cols, valid = self._cells(idx, self.x[idx], self.y[idx])
+        inside = valid & (rows < self.grid_height)
+        games = np.repeat(idx[:, None], 4, axis=1)
+        self.boards[games[inside], rows[inside], cols[inside]] = self.minos[idx][inside]
+        self.game_over[idx[(valid & ~inside).any(axis=1)]] = True
+        self.clear_rows(idx)
+
+    # Clears the full rows of the given games and moves the rows above them down
+    # like Board.clear_and_move_down_rows (100 points per full row)
+    def clear_rows(self, idx):
+        cleared, n_full = clear_full_rows(self.boards[idx])
+        self.boards[idx] = cleared
+        self.scores[idx] += n_full * 100
+
+    # Moves the groups of connected tiles that do not touch the bottom row down
+    # by one row (like Board.move_down_components) in the games in the mask
+    def move_down_floating(self, mask):
+        idx = np.flatnonzero(mask & ~self.game_over)
+        if not len(idx):
+            return
+        boards = self.boards[idx]
+        occupied = boards != 0
+        # grow the tiles connected to the bottom row until nothing changes
+        grounded = np.zeros_like(occupied)
+        grounded[:, 0] = occupied[:, 0]
+        while True:
+            grown = grounded.copy()
+            grown[:, 1:] |= grounded[:, :-1]
+            grown[:, :-1] |= grounded[:, 1:]
+            grown[:, :, 1:] |= grounded[:, :, :-1]
+            grown[:, :, :-1] |= grounded[:, :, 1:]
+            grown &= occupied
+            if (grown == grounded).all():
+                break
+            grounded = grown
+        floating = occupied & ~grounded
+        if not floating.any():
+            return
+        moved = np.where(floating, 0, boards).astype(np.uint8)
+        moved[:, :-1] = np.where(floating[:, 1:], boards[:, 1:], moved[:, :-1])
+        self.boards[idx] = moved
@@ -0,0 +1,259 @@
+################################################################################
+#                                                                              #
+# A benchmark suite for the hot paths of the engine and the rendering: the     #
+# collision checks and rotation of the tetrominoes, merging, the connected     #
+# groups of tiles, row clearing and a full GameGrid.display frame. The grids   #
+# are filled from fixed seeds at several fill levels and sizes, so runs of     #
+# different versions measure the same work. The results (operations per        #
+# second, p50/p99 latency and allocated bytes) are written as JSON.            #
+#                                                                              #
+# Usage: python benchmark.py [--mode headless|render|all] [--repeat 1000]      #
+#        [--sizes 20x12 40x24] [--fills 0.25 0.5 0.75] [--output results.json] #
+#                                                                              #
+################################################################################
+
+import argparse  # for parsing the command line arguments
+import copy  # for copying the grids changed by the benchmarked operations
+import json  # for writing the results
+import os  # for running the drawing without a window
+import platform  # for recording the Python version
+import subprocess  # for running each rendered grid size in a new process
+import sys  # for running this script in the child processes
+import time  # for measuring the operations
+import tracemalloc  # for measuring the allocations
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import Board, Piece
+
+# the grid sizes (height, width) and the fractions of the rows below the top of
+# the tiles that are occupied on the grids of the benchmarks
+GRID_SIZES = [(20, 12), (40, 24)]
+FILL_LEVELS = [0.25, 0.5, 0.75]
+# the seed of the grids and the highest exponent of their tiles (2 ** 7 = 128)
+FIXTURE_SEED = 2048
+FIXTURE_MAX_EXPONENT = 7
+# the number of the timed and the untimed (warm-up) calls of each operation and
+# the number of calls measured for the allocations
+DEFAULT_REPEAT = 1000
+WARMUP = 20
+ALLOCATION_REPEAT = 50
+# the pixel size of a cell in the offscreen render mode (as in Tetris_2048.py)
+CELL_SIZE = 40
+
+
+# Returns the tile exponents of a grid with the given size whose lowest
+# fill * grid_h rows are occupied at random (85 percent of the cells), drawn
+# from a generator seeded with the seed, the size and the fill level. The
+# given number of the lowest rows are made full, and a group of tiles is left
+# floating above the others when floating is True.
+def fixture_exponents(grid_h, grid_w, fill, full_rows=0, floating=False, seed=FIXTURE_SEED):
+    rng = np.random.default_rng([seed, grid_h, grid_w, round(fill * 100)])
+    exponents = rng.integers(1, FIXTURE_MAX_EXPONENT + 1, size=(grid_h, grid_w))
+    height = int(round(fill * grid_h))
+    occupied = np.zeros((grid_h, grid_w), dtype=bool)
+    occupied[:height] = rng.random((height, grid_w)) < 0.85
+    # no full rows other than the requested ones (one empty cell in each row)
+    rows = np.arange(full_rows, height)
+    occupied[rows, rng.integers(0, grid_w, size=len(rows))] = False
+    occupied[:full_rows] = True
+    if floating and height + 3 <= grid_h:
+        occupied[height + 1:height + 3, :3] = True
+    return np.where(occupied, exponents, 0)
+
+
+# Returns a grid (an instance of board_class) with the tiles of fixture_exponents
+def fixture_board(grid_h, grid_w, fill, board_class=Board, **options):
+    board = board_class(grid_h, grid_w)
+    board.set_tile_matrix(fixture_exponents(grid_h, grid_w, fill, **options))
+    return board
+
+
+# Returns a T tetromino (an instance of piece_class) in the middle of the given
+# grid, right above its highest tile (or at the top of a full grid)
+def fixture_piece(board, piece_class=Piece):
+    y = min(max(board.column_heights), board.grid_height - 3)
+    return piece_class.from_state('T', 0, [1, 2, 1, 2], board.grid_width // 2 - 1, y)
+
+
+# Returns the statistics of an operation called with the value returned by
+# setup (which is not measured): the operations per second, the latencies in
+# microseconds and the median of the peak and the retained bytes allocated by
+# a call
+def measure(operation, setup=lambda: None, repeat=DEFAULT_REPEAT):
+    timer = time.perf_counter_ns
+    latencies = []
+    for i in range(WARMUP + repeat):
+        argument = setup()
+        start = timer()
+        operation(argument)
+        end = timer()
+        if i >= WARMUP:
+            latencies.append(end - start)
+    latencies = np.array(latencies) / 1000.0
+    # the allocations are measured in separate calls, as tracing them slows
+    # down the calls that are timed
+    peaks, retained = [], []
+    tracemalloc.start()
+    for _ in range(min(repeat, ALLOCATION_REPEAT)):
+        argument = setup()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        operation(argument)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(current - before)
+        del argument
+    tracemalloc.stop()
+    return {
+        "ops_per_sec": 1e6 / latencies.mean(),
+        "mean_us": latencies.mean(),
+        "p50_us": np.percentile(latencies, 50),
+        "p99_us": np.percentile(latencies, 99),
+        "alloc_peak_bytes": int(np.median(peaks)),
+        "alloc_retained_bytes": int(np.median(retained)),
+        "repeat": repeat,
+    }
+
+
+# Returns the benchmarks of the engine operations on the grids with the given
+# size and fill level as a list of (name, operation, setup) tuples
+def headless_benchmarks(grid_h, grid_w, fill):
+    board = fixture_board(grid_h, grid_w, fill)
+    piece = fixture_piece(board)
+    full = fixture_board(grid_h, grid_w, fill, full_rows=2)
+    floating = fixture_board(grid_h, grid_w, fill, floating=True)
+
+    def copy_piece():
+        position = piece.bottom_left_cell
+        return Piece.from_state(piece.type, piece.rotation, piece.minos, position.x, position.y)
+
+    return [
+        ("can_be_moved", lambda _: (piece.can_be_moved("left", board),
+                                    piece.can_be_moved("right", board),
+                                    piece.can_be_moved("down", board)), lambda: None),
+        ("rotate", lambda p: p.rotate(board), copy_piece),
+        ("merge_tiles", lambda b: b.merge_tiles(), lambda: copy.deepcopy(board)),
+        ("label_components", lambda _: board.label_components(), lambda: None),
+        ("move_down_components", lambda b: b.move_down_components(),
+         lambda: copy.deepcopy(floating)),
+        ("clear_and_move_down_rows", lambda b: b.clear_and_move_down_rows(),
+         lambda: copy.deepcopy(full)),
+    ]
+
+
+# Runs the engine benchmarks on every grid size and fill level
+def run_headless(sizes, fills, repeat):
+    results = []
+    for grid_h, grid_w in sizes:
+        for fill in fills:
+            for name, operation, setup in headless_benchmarks(grid_h, grid_w, fill):
+                result = {"name": name, "mode": "headless", "grid": [grid_h, grid_w], "fill": fill}
+                result.update(measure(operation, setup, repeat))
+                results.append(result)
+    return results
+
+
+# Runs the benchmarks of GameGrid.display drawn offscreen on every fill level
+# of a grid with the given size: a full frame ("display"), a frame after the
+# tetromino has moved by one cell, where only the changed cells are drawn
+# ("display_move"), and a frame of the renderer that draws the whole grid from
+# the tile colors ("display_array", see GameGrid.display_array). A canvas can
+# only be created once in a process (see stddraw.setCanvasSize), so each grid
+# size is rendered in a process of its own (see run_render).
+def run_render_size(grid_h, grid_w, fills, repeat):
+    # draw without opening a window (unless a video driver is set)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import lib.stddraw as stddraw
+    from game_grid import GameGrid
+    from tetromino import Tetromino
+    stddraw.setCanvasSize(CELL_SIZE * grid_w, CELL_SIZE * grid_h)
+    stddraw.setXscale(-0.5, grid_w - 0.5)
+    stddraw.setYscale(-0.5, grid_h - 0.5)
+    Tetromino.grid_height, Tetromino.grid_width = grid_h, grid_w
+    results = []
+    for fill in fills:
+        grid = fixture_board(grid_h, grid_w, fill, board_class=GameGrid)
+        grid.current_tetromino = fixture_piece(grid, Tetromino)
+        position = grid.current_tetromino.bottom_left_cell
+        start_x = position.x
+
+        def redraw_all():
+            grid.drawn_frame = None
+
+        def move_piece():
+            position.x = start_x + 1 if position.x == start_x else start_x
+
+        grid.display()
+        for name, renderer, setup in (("display", "sprites", redraw_all),
+                                      ("display_move", "sprites", move_piece),
+                                      ("display_array", "array", move_piece)):
+            grid.renderer = renderer
+            result = {"name": name, "mode": "render", "grid": [grid_h, grid_w], "fill": fill}
+            result.update(measure(lambda _: grid.display(), setup, repeat))
+            results.append(result)
+    return results
+
+
+# Runs the rendering benchmark of each grid size in a new Python process
+def run_render(sizes, fills, repeat):
+    results = []
+    for grid_h, grid_w in sizes:
+        command = [sys.executable, os.path.abspath(__file__), "--render-child",
+                   "--sizes", "%dx%d" % (grid_h, grid_w), "--repeat", str(repeat),
+                   "--fills"] + [str(fill) for fill in fills]
+        output = subprocess.run(command, check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        results.extend(json.loads(output))
+    return results
+
+
+# Returns the versions of the software and the commit that were measured
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "commit": commit or None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def grid_size(text):
+    grid_h, grid_w = text.lower().split("x")
+    return int(grid_h), int(grid_w)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine and rendering of Tetris 2048.")
+    parser.add_argument("--mode", choices=["headless", "render", "all"], default="all",
+                        help="the operations to measure")
+    parser.add_argument("--sizes", type=grid_size, nargs="+", default=GRID_SIZES,
+                        help="grid sizes as HEIGHTxWIDTH")
+    parser.add_argument("--fills", type=float, nargs="+", default=FILL_LEVELS,
+                        help="fill levels of the grids")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed calls per operation")
+    parser.add_argument("--output", help="file for the JSON results (printed when not given)")
+    parser.add_argument("--render-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.render_child:
+        print(json.dumps(run_render_size(*args.sizes[0], args.fills, args.repeat)))
+        return
+    results = []
+    if args.mode in ("headless", "all"):
+        results += run_headless(args.sizes, args.fills, args.repeat)
+    if args.mode in ("render", "all"):
+        results += run_render(args.sizes, args.fills, args.repeat)
+    text = json.dumps({"environment": environment(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+################################################################################
+#                                                                              #
+# A bot that plays Tetris 2048 by choosing a placement for each tetromino      #
+# (see the placements module) with a beam search. The grids after all the      #
+# placements are scored at once with NumPy from features of this game: the     #
+# holes, the bumpiness of the skyline, the tiles that merge_tiles will merge,  #
+# the cleared rows and the rows that are almost full. The best placements are  #
+# then looked ahead with every type of the next tetromino, and the values of   #
+# the grids seen before are reused from a transposition table.                 #
+#                                                                              #
+################################################################################
+
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import Piece, SPAWN_TYPES, ORIENTATIONS, merge_columns
+from placements import find_placements, lock_all
+from zobrist import TranspositionTable, hash_boards
+
+# the weights of the features (see evaluate)
+DEFAULT_WEIGHTS = {
+    "rows_cleared": 8.0,
+    "merges": 1.5,
+    "near_full_rows": 1.0,
+    "holes": -6.0,
+    "bumpiness": -0.8,
+    "aggregate_height": -0.3,
+    "max_height": -0.5,
+}
+# the value of a placement that ends the game
+GAME_OVER_VALUE = -1e9
+
+
+# Returns the features of each grid in a (n, h, w) array of tile exponents as
+# a dictionary of arrays of length n (see DEFAULT_WEIGHTS for the names)
+def board_features(boards):
+    n_boards, grid_h, grid_w = boards.shape
+    occupied = boards != 0
+    # the height of each column (one more than the row of its highest tile)
+    heights = np.where(occupied.any(axis=1), grid_h - np.argmax(occupied[:, ::-1, :], axis=1), 0)
+    rows = np.arange(grid_h).reshape(1, -1, 1)
+    holes = (~occupied & (rows < heights[:, None, :])).sum(axis=(1, 2))
+    # the tiles that merge_tiles will merge, weighted by their exponents
+    merges = merge_columns(boards)[1]
+    merge_value = (merges * boards[:, :-1, :].astype(np.int64)).sum(axis=(1, 2))
+    row_counts = occupied.sum(axis=2)
+    return {
+        "merges": merge_value,
+        "near_full_rows": ((row_counts >= grid_w - 2) & (row_counts < grid_w)).sum(axis=1),
+        "holes": holes,
+        "bumpiness": np.abs(np.diff(heights, axis=1)).sum(axis=1),
+        "aggregate_height": heights.sum(axis=1),
+        "max_height": heights.max(axis=1),
+    }
+
+
+# Returns the value of each grid in a (n, h, w) array of tile exponents after a
+# placement that has cleared the given numbers of rows (GAME_OVER_VALUE for the
+# placements that end the game)
+def evaluate(boards, rows_cleared, game_over, weights=DEFAULT_WEIGHTS):
+    features = board_features(boards)
+    features["rows_cleared"] = np.asarray(rows_cleared)
+    values = sum(weights[name] * features[name].astype(np.float64) for name in weights)
+    return np.where(game_over, GAME_OVER_VALUE, values)
+
+
+# Returns the (x, y, rotation) states where a tetromino of the given type lands
+# when it is dropped straight down from above the highest tile of each column
+# (given by the column heights), in every rotation state and column
+def drop_states(heights, shape):
+    states = []
+    orientations = ORIENTATIONS[shape][:1] if shape == 'O' else ORIENTATIONS[shape]
+    for rotation, orientation in enumerate(orientations):
+        for x in range(-orientation.min_col, len(heights) - orientation.max_col):
+            y = max(heights[x + col] - offset for col, offset in orientation.bottom_profile)
+            states.append((x, y, rotation))
+    return states
+
+
+# A bot that chooses the placement of each tetromino with a beam search: every
+# placement of the tetromino is evaluated, and the beam_width best ones are
+# valued by adding the mean over the types of the next tetromino of its best
+# straight drop (with all its tiles 2)
+class BeamSearchBot:
+    def __init__(self, beam_width=4, weights=None, lookahead_weight=0.5, cache_size=1 << 16):
+        self.beam_width = beam_width
+        self.weights = DEFAULT_WEIGHTS if weights is None else weights
+        self.lookahead_weight = lookahead_weight
+        # the lookahead values of the grids, keyed by their Zobrist hashes
+        self.cache = TranspositionTable(cache_size)
+
+    # Returns the placement chosen for the given tetromino (None if there is no
+    # placement at all)
+    def choose(self, grid, tetromino):
+        placements = find_placements(grid, tetromino)
+        if not placements:
+            return None
+        boards = np.array([placement.board for placement in placements])
+        values = evaluate(boards, [p.rows_cleared for p in placements],
+                          [p.game_over for p in placements], self.weights)
+        beam = np.argsort(-values, kind='stable')[:self.beam_width]
+        beam = beam[values[beam] > GAME_OVER_VALUE]
+        if len(beam) > 1 and self.lookahead_weight:
+            hashes = hash_boards(grid.zobrist_keys, boards[beam]).tolist()
+            lookahead = [self.cache.get(board_hash) for board_hash in hashes]
+            missing = [k for k, value in enumerate(lookahead) if value is None]
+            if missing:
+                computed = self.lookahead(boards[beam[missing]])
+                for k, value in zip(missing, computed.tolist()):
+                    self.cache.put(hashes[k], value)
+                    lookahead[k] = value
+            values[beam] += self.lookahead_weight * np.array(lookahead)
+            best = beam[np.argmax(values[beam])]
+        else:
+            best = int(np.argmax(values))
+        return placements[best]
+
+    # Returns the keys that move the given tetromino to the chosen placement
+    # (the moves down at the end are replaced with a hard drop)
+    def keys(self, grid, tetromino):
+        placement = self.choose(grid, tetromino)
+        return ['s'] if placement is None else placement.keys()
+
+    # Returns the mean over the types of the next tetromino of the value of its
+    # best straight drop (see drop_states) on each of the given grids, with all
+    # the drops of all the grids evaluated at once
+    def lookahead(self, boards):
+        grid_h = boards.shape[1]
+        occupied = boards != 0
+        heights = np.where(occupied.any(axis=1), grid_h - np.argmax(occupied[:, ::-1, :], axis=1), 0)
+        all_boards, all_cleared, all_over, groups = [], [], [], []
+        for board, board_heights in zip(boards, heights.tolist()):
+            for shape in SPAWN_TYPES:
+                states = drop_states(board_heights, shape)
+                piece = Piece.from_state(shape, 0, [1] * len(ORIENTATIONS[shape][0].cells), 0, 0)
+                locked, cleared, over = lock_all(board, piece, states)
+                all_boards.append(locked)
+                all_cleared.append(cleared)
+                all_over.append(over)
+                groups.append(len(states))
+        values = evaluate(np.concatenate(all_boards), np.concatenate(all_cleared),
+                          np.concatenate(all_over), self.weights)
+        starts = np.cumsum([0] + groups[:-1])
+        best = np.maximum.reduceat(values, starts)
+        return best.reshape(len(boards), len(SPAWN_TYPES)).mean(axis=1)
@@ -0,0 +1,201 @@
+################################################################################
+#                                                                              #
+# An index of the connected groups of tiles (4-connected components) of a game #
+# grid, kept up to date with a union-find structure as tiles are locked,       #
+# merged, cleared and moved, so that only the changed part of the grid is      #
+# revisited instead of labeling the whole grid again.                          #
+#                                                                              #
+################################################################################
+
+import numpy as np  # the fundamental Python module for scientific computing
+
+
+# A class for tracking the connected components of the occupied cells of a grid
+# and the components that are floating (not touching the bottom row)
+class ComponentIndex:
+    def __init__(self, grid_h, grid_w):
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        # the labels are renumbered when there are many more of them than cells
+        self.max_labels = 8 * grid_h * grid_w
+        self.reset()
+
+    # Removes all the components (for an empty grid)
+    def reset(self):
+        # the label of each cell (0 for an empty cell); a label is resolved to
+        # the label of its component (its root) by the find method
+        self.labels = np.zeros((self.grid_height, self.grid_width), dtype=np.int32)
+        self.parent = [0]
+        # the cells and the lowest row of each component, keyed by the root
+        self.cells = {}
+        self.min_row = {}
+        # the roots of the components that do not touch the bottom row
+        self.floating = set()
+        # the cells changed since the components were last labeled and the
+        # occupancy after the changes (see update and refresh)
+        self.pending = None
+        self.pending_occupied = None
+
+    # Rebuilds the components of the given boolean occupancy matrix from scratch
+    def rebuild(self, occupied):
+        self.reset()
+        rows, cols = np.nonzero(occupied)
+        self._label(set(zip(rows.tolist(), cols.tolist())))
+
+    # Returns the root label of the component that the given label belongs to
+    def find(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    # Returns the root label of the component at the given cell (0 if empty)
+    def component_at(self, row, col):
+        self.refresh()
+        label = self.labels[row, col]
+        return self.find(label) if label else 0
+
+    # Joins the components with the given labels and returns the new root (the
+    # cells of the smaller component are added to the larger one)
+    def union(self, label_a, label_b):
+        root_a, root_b = self.find(label_a), self.find(label_b)
+        if root_a == root_b:
+            return root_a
+        if len(self.cells[root_a]) < len(self.cells[root_b]):
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.cells[root_a] |= self.cells.pop(root_b)
+        self.min_row[root_a] = min(self.min_row[root_a], self.min_row.pop(root_b))
+        self.floating.discard(root_b)
+        if self.min_row[root_a] == 0:
+            self.floating.discard(root_a)
+        return root_a
+
+    # Adds a newly occupied cell as a component of its own and joins it with
+    # the components of its occupied neighbors
+    def add(self, row, col):
+        self.refresh()
+        label = len(self.parent)
+        self.parent.append(label)
+        self.labels[row, col] = label
+        self.cells[label] = {(row, col)}
+        self.min_row[label] = row
+        if row > 0:
+            self.floating.add(label)
+        for r, c in self._neighbors(row, col):
+            if self.labels[r, c]:
+                self.union(label, self.labels[r, c])
+
+    # Records that the occupancy of the cells marked in the boolean matrix
+    # changed has changed (occupied is the new occupancy). The components are
+    # labeled again only when they are needed (see refresh), so the merges and
+    # the row clears after a tetromino is locked are relabeled together.
+    def update(self, occupied, changed):
+        if self.pending is None:
+            self.pending = changed.copy()
+        else:
+            self.pending |= changed
+        self.pending_occupied = occupied
+
+    # Returns True when any component is floating
+    def has_floating(self):
+        self.refresh()
+        return bool(self.floating)
+
+    # Labels again the components that touch the cells changed since the last
+    # labeling (see update). Only these components are split up, and their
+    # cells are labeled with one flood fill.
+    def refresh(self):
+        if self.pending is None:
+            return
+        changed, occupied = self.pending, self.pending_occupied
+        self.pending = self.pending_occupied = None
+        if len(self.parent) > self.max_labels:
+            self.rebuild(occupied)
+            return
+        labels = self.labels
+        # the changed cells and their neighbors
+        near = changed.copy()
+        near[1:] |= changed[:-1]
+        near[:-1] |= changed[1:]
+        near[:, 1:] |= changed[:, :-1]
+        near[:, :-1] |= changed[:, 1:]
+        roots = {self.find(label) for label in np.unique(labels[near]).tolist() if label}
+        rows, cols = np.nonzero(changed & occupied)
+        region = set(zip(rows.tolist(), cols.tolist()))
+        for root in roots:
+            region |= self.cells.pop(root)
+            del self.min_row[root]
+            self.floating.discard(root)
+        if not region:
+            return
+        rows, cols = np.array(list(region), dtype=np.intp).T
+        labels[rows, cols] = 0
+        # the cells of the popped components that are still occupied (the
+        # occupied neighbors of these cells are all in the region as well)
+        keep = occupied[rows, cols]
+        self._label(set(zip(rows[keep].tolist(), cols[keep].tolist())))
+
+    # Labels the given set of (row, col) cells as new components, found by a
+    # flood fill (no cell of the set may touch an occupied cell outside it)
+    def _label(self, remaining):
+        while remaining:
+            start = remaining.pop()
+            component, stack = {start}, [start]
+            while stack:
+                row, col = stack.pop()
+                for cell in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                    if cell in remaining:
+                        remaining.remove(cell)
+                        component.add(cell)
+                        stack.append(cell)
+            label = len(self.parent)
+            self.parent.append(label)
+            rows, cols = np.array(list(component), dtype=np.intp).T
+            self.labels[rows, cols] = label
+            self.cells[label] = component
+            self.min_row[label] = int(rows.min())
+            if self.min_row[label] > 0:
+                self.floating.add(label)
+
+    # Moves every floating component down by one row and returns the rows and
+    # the columns of the cells that have moved (before the move)
+    def fall(self):
+        self.refresh()
+        roots = list(self.floating)
+        moved = [cell for root in roots for cell in self.cells[root]]
+        rows = np.array([row for row, col in moved], dtype=np.intp)
+        cols = np.array([col for row, col in moved], dtype=np.intp)
+        labels = self.labels[rows, cols]
+        self.labels[rows, cols] = 0
+        self.labels[rows - 1, cols] = labels
+        for root in roots:
+            self.cells[root] = {(row - 1, col) for row, col in self.cells[root]}
+            self.min_row[root] -= 1
+            if self.min_row[root] == 0:
+                self.floating.discard(root)
+        # a component that has moved may now touch other components
+        for row, col in moved:
+            for r, c in self._neighbors(row - 1, col):
+                if self.labels[r, c]:
+                    self.union(self.labels[row - 1, col], self.labels[r, c])
+        return rows, cols
+
+    # Returns the labels of all the occupied cells as a dictionary keyed by the
+    # (row, col) tuples, with one label per component
+    def label_dict(self):
+        self.refresh()
+        labels = {}
+        for root, cells in self.cells.items():
+            for cell in cells:
+                labels[cell] = root
+        return labels
+
+    def _neighbors(self, row, col):
+        neighbors = []
+        if row > 0: neighbors.append((row - 1, col))
+        if row < self.grid_height - 1: neighbors.append((row + 1, col))
+        if col > 0: neighbors.append((row, col - 1))
+        if col < self.grid_width - 1: neighbors.append((row, col + 1))
+        return neighbors
@@ -0,0 +1,729 @@
+################################################################################
+#                                                                              #
+# The rendering-free rules of Tetris 2048: the grid state, tetromino movement, #
+# locking, merging, row clearing and scoring. Nothing in this module draws,    #
+# so the rules can run without a window (in batch jobs and tests). GameGrid    #
+# and Tetromino add drawing on top of the Board and Piece classes below.       #
+#                                                                              #
+################################################################################
+
+import copy as cp  # the copy module is used for copying tiles and positions
+import random  # the random module is used for generating random values
+from functools import lru_cache  # for creating the piece class of each grid size once
+import numpy as np  # the fundamental Python module for scientific computing
+from point import Point  # used for tile positions
+from components import ComponentIndex  # the connected groups of tiles
+from zobrist import cell_keys, grid_key, hash_tiles, tile_key, rotate_hash, piece_key
+
+# the types of tetrominoes that can enter the game grid
+SPAWN_TYPES = ['L', 'Z', 'O', '.', 'T', 'I', 'J', 'S']
+# the tile number that wins the game and its exponent (2048 = 2 ** 11)
+WINNING_NUMBER = 2048
+WINNING_EXPONENT = 11
+# the number of distinct tile exponents that are counted on a grid
+EXPONENT_LIMIT = 64
+# the number of times that the tile values can be doubled (see update_score)
+# before the exponents stored on a grid have to be rewritten
+DOUBLING_HEADROOM = 2
+
+
+# Returns the tile numbers for an array of tile exponents (0 for empty cells)
+def exponents_to_numbers(exponents):
+    exponents = np.asarray(exponents, dtype=np.int64)
+    return np.where(exponents > 0, np.left_shift(1, exponents), 0)
+
+
+# Merges the equal tiles that are on top of each other in all the columns at
+# once, for a grid or a batch of grids of tile exponents with the shape
+# (..., h, w). Each column is scanned from the bottom up: a tile merges with
+# the equal tile above it, the tiles above the pair move down by one and the
+# scan continues above the merged tile. Returns the merged exponents and a
+# boolean mask with the shape (..., h - 1, w) marking the lower tile of each
+# merged pair (in the rows before the merge).
+def merge_columns(exponents):
+    exponents = np.asarray(exponents)
+    height = exponents.shape[-2]
+    lower, upper = exponents[..., :-1, :], exponents[..., 1:, :]
+    equal = (lower == upper) & (lower != 0)
+    # in a run of equal tiles the pairs are formed from the bottom of the run,
+    # so a pair starts at every even distance from the start of the run
+    rows = np.arange(height - 1).reshape(-1, 1)
+    run_start = np.maximum.accumulate(np.where(equal, 0, rows + 1), axis=-2)
+    merges = equal & ((rows - run_start) % 2 == 0)
+    merged = exponents.copy()
+    if not merges.any():
+        return merged, merges
+    merged[..., :-1, :] += merges
+    # remove the upper tile of each pair and move everything above it down
+    removed = np.zeros(exponents.shape, dtype=bool)
+    removed[..., 1:, :] = merges
+    order = np.argsort(removed, axis=-2, kind='stable')
+    merged = np.take_along_axis(merged, order, axis=-2)
+    n_removed = removed.sum(axis=-2, keepdims=True)
+    merged[np.arange(height).reshape(-1, 1) >= height - n_removed] = 0
+    return merged, merges
+
+
+# Clears the full rows of a grid or a batch of grids of tile exponents with the
+# shape (..., h, w) like Board.clear_and_move_down_rows: every row that is not
+# full moves down by the number of full rows below it. Returns the cleared
+# exponents and the number of full rows of each grid.
+def clear_full_rows(exponents):
+    exponents = np.asarray(exponents)
+    full = (exponents != 0).all(axis=-1)
+    n_full = full.sum(axis=-1)
+    cleared = exponents.copy()
+    if not full.any():
+        return cleared, n_full
+    full_below = np.cumsum(full, axis=-1) - full
+    moving = np.nonzero(~full & (full_below > 0))
+    cleared[moving] = 0
+    cleared[moving[:-1] + (moving[-1] - full_below[moving],)] = exponents[moving]
+    return cleared, n_full
+
+
+# A class for modeling the state of the game grid and the rules applied to it
+class Board:
+    def __init__(self, grid_h, grid_w):
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        # the locked tiles stored as the exponents of their numbers relative to
+        # exponent_offset (a tile with the number 2 ** e is stored as
+        # e - exponent_offset, and 0 denotes an empty cell). Doubling every tile
+        # only increments the offset, which is kept at or below 0 so that the
+        # stored value of any tile is at least 1.
+        self.tile_matrix = np.zeros((grid_h, grid_w), dtype=np.uint8)
+        self.exponent_offset = -DOUBLING_HEADROOM
+        # the occupied cells of each row as an integer bitmask (the bit col of
+        # row_masks[row] is set when the cell (row, col) is occupied), used for
+        # the collision checks of the tetrominoes
+        self._col_bits = np.left_shift(1, np.arange(grid_w, dtype=np.int64))
+        self.row_masks = [0] * grid_h
+        # the number of tiles in each row and the number of full rows, so that
+        # the full rows are known without scanning the grid
+        self.row_counts = [0] * grid_h
+        self.full_rows = 0
+        # the height of each column (one more than the row of its highest tile,
+        # 0 for an empty column), used for finding where a tetromino lands
+        self.column_heights = [0] * grid_w
+        # the connected groups of tiles, used for moving the floating ones down
+        self.components = ComponentIndex(grid_h, grid_w)
+        # the number of tiles with each exponent and the highest exponent on
+        # the grid, used for the win check and the tile statistics
+        self.exponent_counts = np.zeros(EXPONENT_LIMIT, dtype=np.int64)
+        self.max_exponent = 0
+        # the Zobrist hash of the tiles (see the zobrist module), updated with
+        # every change of the tiles and starting from the key of the grid size
+        self.zobrist_keys = cell_keys(grid_h, grid_w)
+        self.zobrist_grid_key = grid_key(grid_h, grid_w)
+        self.zobrist = self.zobrist_grid_key
+        self.current_tetromino = None
+        self.game_over = False
+        self.game_won = False
+        self.score = 0
+        self.doubled = False
+        self.quadrupled = False
+
+    def is_occupied(self, row, col):
+        if not self.is_inside(row, col):
+            return False
+        return self.tile_matrix[row, col] != 0
+
+    # Returns the number of the tile at the given cell (0 for an empty cell)
+    def number_at(self, row, col):
+        stored = int(self.tile_matrix[row, col])
+        return 2 ** (stored + self.exponent_offset) if stored else 0
+
+    # Returns the exponents of the tile numbers for the given stored values (the
+    # whole tile matrix by default), with 0 for the empty cells
+    def exponent_matrix(self, stored=None):
+        if stored is None:
+            stored = self.tile_matrix
+        return np.where(stored != 0, stored.astype(np.int64) + self.exponent_offset, 0)
+
+    # Returns the tile numbers of the whole grid (0 for the empty cells)
+    def values(self):
+        return exponents_to_numbers(self.exponent_matrix())
+
+    # Returns the number of the highest tile on the grid (0 for an empty grid)
+    def max_tile(self):
+        return 2 ** self.max_exponent if self.max_exponent else 0
+
+    # Returns how many tiles with the given number there are on the grid
+    def count_tiles(self, number):
+        exponent = number.bit_length() - 1
+        return int(self.exponent_counts[exponent]) if 0 < exponent < EXPONENT_LIMIT else 0
+
+    # Replaces the tiles on the grid with the given matrix of tile exponents
+    # (0 for the empty cells) and rebuilds everything derived from the tiles
+    def set_tile_matrix(self, tile_matrix):
+        exponents = np.asarray(tile_matrix, dtype=np.int64)
+        self.tile_matrix = np.where(exponents != 0, exponents - self.exponent_offset, 0).astype(np.uint8)
+        self.update_row_masks()
+        self.update_column_heights()
+        self.components.rebuild(self.tile_matrix != 0)
+        self.update_exponent_counts()
+        self.zobrist = self.zobrist_grid_key ^ self.hash_cells(self.tile_matrix, self.tile_matrix != 0)
+
+    # Returns the XOR of the Zobrist keys of the tiles in the given matrix of
+    # stored values at the cells marked in the boolean matrix mask
+    def hash_cells(self, stored, mask):
+        mask = mask & (stored != 0)
+        return hash_tiles(self.zobrist_keys[mask], stored[mask].astype(np.int64) + self.exponent_offset)
+
+    # Returns the Zobrist hash of the tiles and of the given falling tetromino
+    # (if any), e.g. as the key of a TranspositionTable
+    def zobrist_hash(self, tetromino=None):
+        if tetromino is None:
+            return self.zobrist
+        position = tetromino.bottom_left_cell
+        return self.zobrist ^ piece_key(tetromino.type, tetromino.rotation, position.x, position.y)
+
+    # Recomputes the tile counts and the highest tile, from the tile matrix or
+    # (after the tiles given by the boolean matrix changed have been replaced)
+    # from the given tile matrix before the change
+    def update_exponent_counts(self, old_tile_matrix=None, changed=None):
+        if changed is None:
+            self.exponent_counts = np.bincount(self.exponent_matrix().ravel(),
+                                               minlength=EXPONENT_LIMIT)
+        else:
+            self.exponent_counts += np.bincount(self.exponent_matrix(self.tile_matrix[changed]),
+                                                minlength=EXPONENT_LIMIT)
+            self.exponent_counts -= np.bincount(self.exponent_matrix(old_tile_matrix[changed]),
+                                                minlength=EXPONENT_LIMIT)
+        self.exponent_counts[0] = 0
+        self.update_max_exponent()
+
+    def update_max_exponent(self):
+        exponents = np.flatnonzero(self.exponent_counts)
+        self.max_exponent = int(exponents[-1]) if len(exponents) else 0
+
+    # Recomputes the row bitmasks and the row counters from the tile matrix
+    # (after the tiles have been moved in bulk), for all the rows or only for
+    # the given rows
+    def update_row_masks(self, rows=None):
+        occupied = self.tile_matrix != 0
+        if rows is None:
+            self.row_masks = occupied.dot(self._col_bits).tolist()
+            self.row_counts = occupied.sum(axis=1).tolist()
+        else:
+            for row in rows:
+                self.row_masks[row] = int(occupied[row].dot(self._col_bits))
+                self.row_counts[row] = int(occupied[row].sum())
+        self.full_rows = self.row_counts.count(self.grid_width)
+
+    # Recomputes the column heights from the tile matrix, for all the columns
+    # or only for the given columns
+    def update_column_heights(self, cols=None):
+        if cols is None:
+            cols = range(self.grid_width)
+        cols = list(cols)
+        occupied = self.tile_matrix[:, cols] != 0
+        heights = np.where(occupied.any(axis=0),
+                           self.grid_height - np.argmax(occupied[::-1], axis=0), 0)
+        for col, height in zip(cols, heights.tolist()):
+            self.column_heights[col] = height
+
+    def is_inside(self, row, col):
+        if row < 0 or row >= self.grid_height:
+            return False
+        if col < 0 or col >= self.grid_width:
+            return False
+        return True
+
+    def update_grid(self, tiles_to_lock, blc_position):
+        n_rows, n_cols = len(tiles_to_lock), len(tiles_to_lock[0])
+        for col in range(n_cols):
+            for row in range(n_rows):
+                if tiles_to_lock[row][col] != 0:
+                    pos = Point()
+                    pos.x = blc_position.x + col
+                    pos.y = blc_position.y + (n_rows - 1) - row
+                    if self.is_inside(pos.y, pos.x):
+                        exponent = int(tiles_to_lock[row][col])
+                        # a tile locked onto an occupied cell (a tetromino that
+                        # enters the grid on top of the tiles) replaces its tile
+                        old = int(self.tile_matrix[pos.y, pos.x])
+                        self.tile_matrix[pos.y, pos.x] = exponent - self.exponent_offset
+                        self.row_masks[pos.y] |= 1 << pos.x
+                        if not old:
+                            self.row_counts[pos.y] += 1
+                            if self.row_counts[pos.y] == self.grid_width:
+                                self.full_rows += 1
+                        self.column_heights[pos.x] = max(self.column_heights[pos.x], pos.y + 1)
+                        if not old:
+                            self.components.add(pos.y, pos.x)
+                        self.exponent_counts[exponent] += 1
+                        if old:
+                            self.exponent_counts[old + self.exponent_offset] -= 1
+                            self.update_max_exponent()
+                        self.max_exponent = max(self.max_exponent, exponent)
+                        self.zobrist ^= tile_key(self.zobrist_keys[pos.y, pos.x], exponent)
+                        if old:
+                            self.zobrist ^= tile_key(self.zobrist_keys[pos.y, pos.x],
+                                                     old + self.exponent_offset)
+                    else:
+                        self.game_over = True
+        self.clear_and_move_down_rows()
+        return self.game_over
+
+    def update_score(self, points):
+        self.score += points
+        if self.score >= 200 and not self.doubled:
+            self.double_tiles_value()
+            self.doubled = True
+
+        elif self.score >= 16000 and not self.quadrupled:
+            self.double_tiles_value()
+            self.quadrupled = True
+
+    def delete_free_tiles_and_update_score(self):
+        old_tile_matrix = self.tile_matrix.copy()
+        occupied = self.tile_matrix != 0
+        for col in range(self.grid_width):
+            conqat = [False] * self.grid_height
+            for row in range(self.grid_height - 1, -1, -1):
+                if self.tile_matrix[row, col] != 0:
+                    if row == self.grid_height - 1 or conqat[row + 1]:
+                        conqat[row] = True
+                    else:
+                        self.update_score(self.number_at(row, col))
+                        self.tile_matrix[row, col] = 0
+        self.update_row_masks()
+        self.update_column_heights()
+        self.components.update(self.tile_matrix != 0, occupied != (self.tile_matrix != 0))
+        self.update_exponent_counts(old_tile_matrix, old_tile_matrix != self.tile_matrix)
+        self.zobrist = self.zobrist_grid_key ^ self.hash_cells(self.tile_matrix, self.tile_matrix != 0)
+
+    # Clears the full rows and moves the rows above them down, adding 100
+    # points per full row to the score. Returns the number of full rows.
+    def clear_and_move_down_rows(self):
+        if self.full_rows == 0:
+            return 0
+        old_tile_matrix = self.tile_matrix.copy()
+        occupied = old_tile_matrix != 0
+        full = np.array(self.row_counts) == self.grid_width
+        # every row that is not full moves down by the number of full rows
+        # below it (and leaves an empty row behind)
+        full_below = np.cumsum(full) - full
+        moving = np.flatnonzero(~full & (full_below > 0))
+        tiles = self.tile_matrix[moving]
+        self.tile_matrix[moving] = 0
+        self.tile_matrix[moving - full_below[moving]] = tiles
+        rows_cleared = int(full.sum())
+        changed = old_tile_matrix != self.tile_matrix
+        self.update_row_masks()
+        self.update_column_heights()
+        self.components.update(self.tile_matrix != 0, occupied != (self.tile_matrix != 0))
+        self.update_exponent_counts(old_tile_matrix, changed)
+        self.zobrist ^= self.hash_cells(old_tile_matrix, changed) ^ self.hash_cells(self.tile_matrix, changed)
+
+        self.score += rows_cleared * 100
+        return rows_cleared
+
+    # Merges the equal tiles on top of each other in every column (see
+    # merge_columns) and adds the merged numbers to the score. Returns the
+    # points scored and a boolean mask of the cells that have changed.
+    def merge_tiles(self):
+        merged, merges = merge_columns(self.tile_matrix)
+        changed = merged != self.tile_matrix
+        score_before = self.score
+        if merges.any():
+            # the merged numbers are scored column by column, from the bottom
+            # up, as the doubling of the tile values depends on that order
+            cols, rows = np.nonzero(merges.T)
+            exponents = self.exponent_matrix(self.tile_matrix[rows, cols]) + 1
+            # each merge replaces two tiles with one tile of the next exponent
+            self.exponent_counts -= 2 * np.bincount(exponents - 1, minlength=EXPONENT_LIMIT)
+            self.exponent_counts += np.bincount(exponents, minlength=EXPONENT_LIMIT)
+            self.max_exponent = max(self.max_exponent, int(exponents.max()))
+            self.components.update(merged != 0, (merged != 0) != (self.tile_matrix != 0))
+            self.zobrist ^= self.hash_cells(self.tile_matrix, changed) ^ self.hash_cells(merged, changed)
+            self.tile_matrix = merged
+            self.update_row_masks()
+            self.update_column_heights(np.flatnonzero(changed.any(axis=0)))
+            doublings = 0
+            for exponent in exponents.tolist():
+                doubled = self.doubled, self.quadrupled
+                self.update_score(2 ** (exponent + doublings))
+                if (self.doubled, self.quadrupled) != doubled:
+                    doublings += 1
+        self.check_win()
+        return self.score - score_before, changed
+
+    # Returns the label of the connected group of tiles (4-connected component)
+    # of each occupied cell as a dictionary keyed by the (row, col) tuples
+    def label_components(self):
+        return self.components.label_dict()
+
+    # Moves every group of connected tiles that does not touch the bottom row
+    # of the grid down by one row. The groups are tracked incrementally (see
+    # the ComponentIndex class), so only the moving tiles are visited. Returns
+    # True when any tile has moved.
+    def move_down_components(self):
+        if not self.components.has_floating():
+            return False
+        rows, cols = self.components.fall()
+        exponents = self.tile_matrix[rows, cols]
+        self.tile_matrix[rows, cols] = 0
+        self.tile_matrix[rows - 1, cols] = exponents
+        actual = exponents.astype(np.int64) + self.exponent_offset
+        self.zobrist ^= (hash_tiles(self.zobrist_keys[rows, cols], actual)
+                         ^ hash_tiles(self.zobrist_keys[rows - 1, cols], actual))
+        self.update_row_masks(range(rows.min() - 1, rows.max() + 1))
+        self.update_column_heights(np.unique(cols))
+        return True
+
+    # Doubles the numbers of all the tiles on the grid. Doubling a tile number
+    # increments its exponent, so this only increments the exponent offset
+    # applied when the tiles are read (the stored values are rewritten only
+    # when the offset runs out of headroom).
+    def double_tiles_value(self):
+        self.exponent_offset += 1
+        if self.exponent_offset > 0:
+            self.tile_matrix[self.tile_matrix != 0] += DOUBLING_HEADROOM + 1
+            self.exponent_offset = -DOUBLING_HEADROOM
+        self.exponent_counts[2:] = self.exponent_counts[1:-1].copy()
+        self.exponent_counts[1] = 0
+        if self.max_exponent:
+            self.max_exponent += 1
+        # every exponent is incremented, which rotates the XOR of the tile keys
+        # (see zobrist)
+        self.zobrist = rotate_hash(self.zobrist ^ self.zobrist_grid_key) ^ self.zobrist_grid_key
+
+    # Marks the game as won (without drawing anything) when a tile on the grid
+    # has reached the winning number
+    def check_win(self):
+        if self.exponent_counts[WINNING_EXPONENT]:
+            self.game_won = True
+            return True
+        return False
+
+    def reset(self):
+        self.game_over = False
+        self.game_won = False
+        self.score = 0
+        self.tile_matrix = np.zeros((self.grid_height, self.grid_width), dtype=np.uint8)
+        self.row_masks = [0] * self.grid_height
+        self.row_counts = [0] * self.grid_height
+        self.exponent_offset = -DOUBLING_HEADROOM
+        self.exponent_counts[:] = 0
+        self.max_exponent = 0
+        self.full_rows = 0
+        self.column_heights = [0] * self.grid_width
+        self.components.reset()
+        self.zobrist = self.zobrist_grid_key
+
+
+# The size n of the (n x n) tile matrix of each type of tetromino and its
+# occupied cells as (column_index, row_index) pairs in the initial rotation
+# state (see the documentation given with this code)
+SHAPES = {
+    'I': (4, [(1, 0), (1, 1), (1, 2), (1, 3)]),
+    '.': (1, [(0, 0)]),
+    'O': (2, [(0, 0), (1, 0), (0, 1), (1, 1)]),
+    'Z': (3, [(0, 1), (1, 1), (1, 2), (2, 2)]),
+    'J': (3, [(0, 0), (0, 1), (1, 1), (2, 1)]),
+    'L': (3, [(2, 0), (0, 1), (1, 1), (2, 1)]),
+    'S': (3, [(1, 0), (2, 0), (0, 1), (1, 1)]),
+    'T': (3, [(1, 0), (0, 1), (1, 1), (2, 1)]),
+}
+
+
+# A class for modeling one rotation state of a tetromino: the occupied cells of
+# its tile matrix, their bounding box and the bitmask of each row (the bit col
+# is set when the cell in that column is occupied)
+class Orientation:
+    def __init__(self, n, cells):
+        self.n = n  # n = number of rows = number of columns in the tile matrix
+        # the (row_index, column_index) of each tile (mino) of the tetromino
+        self.cells = tuple(cells)
+        self.rows = np.array([row for row, col in cells])
+        self.cols = np.array([col for row, col in cells])
+        self.min_row, self.max_row = int(self.rows.min()), int(self.rows.max())
+        self.min_col, self.max_col = int(self.cols.min()), int(self.cols.max())
+        self.row_masks = [0] * n
+        for row, col in cells:
+            self.row_masks[row] |= 1 << col
+        # the bottom profile: the lowest occupied cell of each occupied column,
+        # as (column_index, offset) pairs where the offset is the height of the
+        # cell above the bottom row of the tile matrix
+        self.bottom_profile = [(col, (n - 1) - max(r for r, c in cells if c == col))
+                               for col in range(self.min_col, self.max_col + 1)
+                               if any(c == col for r, c in cells)]
+
+    # Returns the orientation rotated 90 degrees clockwise (the same rotation as
+    # np.rot90 with a negative angle applied to the tile matrix)
+    def rotated(self):
+        return Orientation(self.n, [(col, self.n - 1 - row) for row, col in self.cells])
+
+    # Returns whether the tiles in this orientation with the bottom left cell of
+    # the tile matrix at (x, y) are inside the left, right and lower boundaries
+    # of a grid with the given size and its row bitmasks (the cells above the
+    # grid are never occupied)
+    def fits(self, row_masks, x, y, grid_w, grid_h):
+        n = self.n
+        if x + self.min_col < 0 or x + self.max_col >= grid_w:
+            return False
+        if y + (n - 1) - self.max_row < 0:
+            return False
+        for row in range(self.min_row, self.max_row + 1):
+            mask = self.row_masks[row]
+            grid_row = y + (n - 1) - row
+            if mask and grid_row < grid_h:
+                shifted = mask << x if x >= 0 else mask >> -x
+                if shifted & row_masks[grid_row]:
+                    return False
+        return True
+
+    # Returns whether the whole tile matrix with its bottom left cell at (x, y)
+    # is inside a grid with the given size and empty (the test for a rotation,
+    # whatever the occupied cells of the next orientation)
+    def box_fits(self, row_masks, x, y, grid_w, grid_h):
+        n = self.n
+        if x < 0 or x + n > grid_w or y < 0 or y + n > grid_h:
+            return False
+        box = ((1 << n) - 1) << x
+        return not any(row_masks[y + i] & box for i in range(n))
+
+
+# Builds the four rotation states of each type of tetromino, indexed by the
+# number of clockwise rotations from the initial state
+def _build_orientations():
+    orientations = {}
+    for shape, (n, occupied_cells) in SHAPES.items():
+        states = [Orientation(n, [(row, col) for col, row in occupied_cells])]
+        for _ in range(3):
+            states.append(states[-1].rotated())
+        orientations[shape] = states
+    return orientations
+
+
+ORIENTATIONS = _build_orientations()
+
+
+# A class for modeling the state and the movement of a tetromino with 7
+# different types as I, O, Z, S, L, J and T (and the single tile '.')
+class Piece:
+    # the dimensions of the game grid (defined as class variables)
+    grid_height, grid_width = None, None
+    tetromino_types = ['I', 'O', 'Z', 'S', 'L', 'J', 'T']
+
+    # A constructor for creating a tetromino with a given shape (type), drawing
+    # its tile numbers and position from rng (the random module by default, or
+    # a seeded random.Random instance for a reproducible game)
+    def __init__(self, shape, rng=random):
+        self.type = shape  # set the type of this tetromino
+        # the rotation state of this tetromino (an index into ORIENTATIONS)
+        # and its occupied cells (see the Orientation class)
+        self.rotation = 0
+        self.shape = ORIENTATIONS[shape][0]
+        # assign a random number (2 = 2 ** 1 or 4 = 2 ** 2) to each tile (mino)
+        # of this tetromino, stored as the exponent of the number
+        self.minos = np.array([rng.choice([1, 2]) for _ in self.shape.cells], dtype=np.uint8)
+        # initialize the position of this tetromino (as the bottom left cell in
+        # the tile matrix) with a random horizontal position above the game grid
+        n = self.shape.n
+        self.bottom_left_cell = Point()
+        self.bottom_left_cell.y = self.grid_height - 1
+        self.bottom_left_cell.x = rng.randint(0, self.grid_width - n)
+
+    # Returns a tetromino of the given type in the given state (rotation, tile
+    # exponents and position of the bottom left cell), e.g. one restored from a
+    # saved game, without drawing any random values
+    @classmethod
+    def from_state(cls, shape, rotation, minos, x, y):
+        piece = cls.__new__(cls)
+        piece.type = shape
+        piece.rotation = rotation
+        piece.shape = ORIENTATIONS[shape][rotation]
+        piece.minos = np.array(minos, dtype=np.uint8)
+        piece.bottom_left_cell = Point(x, y)
+        return piece
+
+    # The tile matrix of this tetromino in its current rotation state, as the
+    # exponents of the tile numbers (0 for an empty cell)
+    @property
+    def tile_matrix(self):
+        shape = self.shape
+        matrix = np.zeros((shape.n, shape.n), dtype=np.uint8)
+        matrix[shape.rows, shape.cols] = self.minos
+        return matrix
+
+    # Returns the tile numbers in the tile matrix (0 for the empty cells)
+    def values(self):
+        return exponents_to_numbers(self.tile_matrix)
+
+    # A method that computes and returns the position of the cell in the tile
+    # matrix specified by the given row and column indexes
+    def get_cell_position(self, row, col):
+        n = self.shape.n  # n = number of rows = number of columns
+        position = Point()
+        # horizontal position of the cell
+        position.x = self.bottom_left_cell.x + col
+        # vertical position of the cell
+        position.y = self.bottom_left_cell.y + (n - 1) - row
+        return position
+
+    # A method to return a copy of the tile matrix without any empty row/column,
+    # and the position of the bottom left cell when return_position is set
+    def get_min_bounded_tile_matrix(self, return_position=False):
+        shape = self.shape
+        # the rows and columns to copy (omitting the empty ones) are stored in
+        # the orientation of this tetromino
+        copy = np.zeros((shape.max_row - shape.min_row + 1, shape.max_col - shape.min_col + 1),
+                        dtype=np.uint8)
+        copy[shape.rows - shape.min_row, shape.cols - shape.min_col] = self.minos
+        # return just the matrix copy when return_position is not set (as True)
+        if not return_position:
+            return copy
+        # otherwise return the position of the bottom left cell in copy as well
+        blc_position = cp.copy(self.bottom_left_cell)
+        blc_position.translate(shape.min_col, (shape.n - 1) - shape.max_row)
+        return copy, blc_position
+
+    # A method for moving this tetromino in a given direction by 1 on the grid
+    def move(self, direction, game_grid):
+        # check if this tetromino can be moved in the given direction
+        if not (self.can_be_moved(direction, game_grid)):
+            return False  # the tetromino cannot be moved in the given direction
+        # move this tetromino by updating the position of its bottom left cell
+        if direction == "left":
+            self.bottom_left_cell.x -= 1
+        elif direction == "right":
+            self.bottom_left_cell.x += 1
+        else:  # direction == "down"
+            self.bottom_left_cell.y -= 1
+        return True  # a successful move in the given direction
+
+    # A method that computes the bottom row of the tile matrix (the y of the
+    # bottom left cell) at which this tetromino would land if dropped straight
+    # down. Tetrominoes above the columns they cover land directly on the
+    # column heights of the grid; a tetromino below the top of any of those
+    # columns is moved down cell by cell instead.
+    def get_landing_row(self, game_grid):
+        x, y = self.bottom_left_cell.x, self.bottom_left_cell.y
+        heights = game_grid.column_heights
+        landing_row = None
+        for col, offset in self.shape.bottom_profile:
+            height = heights[x + col]
+            if y + offset < height:
+                landing_row = None
+                break
+            if landing_row is None or height - offset > landing_row:
+                landing_row = height - offset
+        if landing_row is None:
+            start_row = y
+            while self.can_be_moved("down", game_grid):
+                self.bottom_left_cell.y -= 1
+            landing_row, self.bottom_left_cell.y = self.bottom_left_cell.y, start_row
+        return landing_row
+
+    # A method for dropping this tetromino straight down until it lands (hard
+    # drop). Returns the number of rows that it has moved down.
+    def drop(self, game_grid):
+        landing_row = self.get_landing_row(game_grid)
+        distance = self.bottom_left_cell.y - landing_row
+        self.bottom_left_cell.y = landing_row
+        return distance
+
+    # A method that is used for rotating every tetromino in clock-wise direction by 90 degree
+    def rotate(self, game_grid):
+        # skip rotation for 'O' tetromino (square shape) as it looks the same when rotated
+        if self.type == 'O':
+            return False
+        # check if the rotated tetromino can maintain its position without
+        # collisions (the whole tile matrix must fit, whatever the rotation)
+        if not self.can_be_moved("rotate", game_grid):
+            return False  # return false to indicate rotation failed
+        # rotate the tile matrix 90 degrees clockwise (the next rotation state)
+        self.rotation = (self.rotation + 1) % 4
+        self.shape = ORIENTATIONS[self.type][self.rotation]
+        return True
+
+    # A method for checking if this tetromino can be moved in a given direction
+    # (the rows of the tile matrix are tested against the rows of the grid as
+    # bitmasks, see Orientation.fits and Board.row_masks)
+    def can_be_moved(self, direction, game_grid):
+        x, y = self.bottom_left_cell.x, self.bottom_left_cell.y
+        if direction == "rotate":
+            # every cell of the tile matrix must be inside the grid and empty
+            return self.shape.box_fits(game_grid.row_masks, x, y,
+                                       game_grid.grid_width, game_grid.grid_height)
+        dx, dy = 0, 0
+        if direction == "left":
+            dx = -1
+        elif direction == "right":
+            dx = 1
+        elif direction == "down":
+            dy = -1
+        else:
+            return True
+        # check for the boundaries and the occupied cells at the new position
+        return self.shape.fits(game_grid.row_masks, x + dx, y + dy,
+                               game_grid.grid_width, game_grid.grid_height)
+
+
+# Returns a new piece of a random type (see SPAWN_TYPES) created by calling
+# piece_class with the chosen type. All the random choices of the piece are
+# drawn from rng (see Piece).
+def create_piece(piece_class=Piece, rng=random):
+    random_index = rng.randint(0, len(SPAWN_TYPES) - 1)
+    return piece_class(SPAWN_TYPES[random_index], rng)
+
+
+# Returns a subclass of piece_class whose tetrominoes enter a grid with the
+# given size (the class variables grid_height and grid_width), so that games
+# with different grid sizes in one process do not change the class variables
+# of piece_class that the tetrominoes of the other games read
+@lru_cache(maxsize=None)
+def sized_piece_class(piece_class, grid_h, grid_w):
+    return type(piece_class.__name__, (piece_class,), {"grid_height": grid_h, "grid_width": grid_w})
+
+
+# A class that applies the user inputs and the gravity ticks of the main loop to
+# a board and its falling tetromino
+class Game:
+    def __init__(self, grid, create_tetromino=create_piece):
+        self.grid = grid
+        self.create_tetromino = create_tetromino
+        self.paused = False
+        self.current_tetromino = None
+        # the number of tetrominoes created so far
+        self.pieces = 0
+        self.spawn()
+
+    # Replaces the falling tetromino with a newly created one
+    def spawn(self):
+        self.current_tetromino = self.create_tetromino()
+        self.pieces += 1
+        self.grid.current_tetromino = self.current_tetromino
+
+    # Applies a key typed by the user ('p' toggles the pause, the arrow keys
+    # move and rotate the tetromino and 's' drops it) and then moves the
+    # floating tiles down
+    def handle_key(self, key_typed):
+        if key_typed == 'p':
+            self.paused = not self.paused
+        if not self.paused:
+            tetromino = self.current_tetromino
+            if key_typed in ("left", "right", "down"):
+                tetromino.move(key_typed, self.grid)
+            elif key_typed == "up":
+                tetromino.rotate(self.grid)
+            elif key_typed == 's':
+                # move the tetromino down until it can't move further
+                tetromino.drop(self.grid)
+        self.grid.move_down_components()
+
+    # Moves the tetromino down by one, merges the tiles and locks the tetromino
+    # when it has landed. Returns True when the game is over.
+    def fall(self):
+        success = self.current_tetromino.move("down", self.grid)
+        self.grid.merge_tiles()
+        if not success:
+            tiles, pos = self.current_tetromino.get_min_bounded_tile_matrix(True)
+            if self.grid.update_grid(tiles, pos):
+                return True
+            self.spawn()
+        return False
@@ -0,0 +1,149 @@
+################################################################################
+#                                                                              #
+# Gym-style environments for training and evaluating agents on Tetris 2048     #
+# without a window. reset() starts a game and step(action) advances it, both   #
+# returning observations as integer arrays: the tile exponents of the grid,    #
+# the type index (into SPAWN_TYPES), rotation and position of the falling      #
+# tetromino and the exponents of its tiles. TetrisEnv plays one game with the  #
+# engine rules; VecTetrisEnv plays many at once with the batch engine.         #
+#                                                                              #
+################################################################################
+
+import random  # the random module is used for generating random values
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import Board, Piece, Game, SPAWN_TYPES, create_piece, sized_piece_class
+from batch import BatchGame, KEYS
+from placements import find_placements
+
+
+# An environment for one game. In the "moves" action mode an action is a key
+# code (see batch.KEYS, 0 for no key) applied before one fall tick; in the
+# "placements" action mode an action is an index into self.placements (the
+# placements of the falling tetromino, see the placements module) and the game
+# is played until the next tetromino enters the grid. The reward of a step is
+# the increase of the score.
+class TetrisEnv:
+    def __init__(self, grid_h=20, grid_w=12, action_mode="moves", max_ticks=None, seed=None):
+        if action_mode not in ("moves", "placements"):
+            raise ValueError("unknown action mode: " + str(action_mode))
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.action_mode = action_mode
+        self.max_ticks = max_ticks
+        # the seeds of the games are drawn from this generator, and the seed of
+        # the current game is kept for replaying it (see the replay module)
+        self.seeds = random.Random(seed)
+        self.game_seed = None
+        self.game = None
+        self.ticks = 0
+        self.placements = []
+
+    # Starts a new game (seeded with the given seed, if any) and returns the
+    # observation and an info dictionary
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seeds = random.Random(seed)
+        self.game_seed = self.seeds.randrange(2 ** 32)
+        rng = random.Random(self.game_seed)
+        piece_class = sized_piece_class(Piece, self.grid_height, self.grid_width)
+        self.game = Game(Board(self.grid_height, self.grid_width),
+                         lambda: create_piece(piece_class, rng))
+        self.ticks = 0
+        return self.observation(), self.info()
+
+    # Applies an action and returns the observation, the reward, whether the
+    # game is over, whether the tick limit has been reached and an info
+    # dictionary (as a gymnasium environment does)
+    def step(self, action):
+        game = self.game
+        score_before = game.grid.score
+        if self.action_mode == "moves":
+            keys = [] if KEYS[action] is None else [KEYS[action]]
+        else:
+            keys = self.placements[action].keys()
+        for key in keys:
+            game.handle_key(key)
+        pieces = game.pieces
+        terminated = False
+        while not terminated:
+            terminated = game.fall()
+            self.ticks += 1
+            if self.action_mode == "moves" or game.pieces != pieces or self.truncated():
+                break
+        reward = game.grid.score - score_before
+        return self.observation(), reward, terminated, self.truncated() and not terminated, self.info()
+
+    def truncated(self):
+        return self.max_ticks is not None and self.ticks >= self.max_ticks
+
+    # Returns the observation of the game (and finds the placements of the
+    # falling tetromino in the "placements" action mode)
+    def observation(self):
+        grid, tetromino = self.game.grid, self.game.current_tetromino
+        if self.action_mode == "placements":
+            self.placements = find_placements(grid, tetromino)
+        minos = np.zeros(4, dtype=np.uint8)
+        minos[:len(tetromino.minos)] = tetromino.minos
+        position = tetromino.bottom_left_cell
+        return {
+            "board": grid.exponent_matrix().astype(np.uint8),
+            "piece": np.array([SPAWN_TYPES.index(tetromino.type), tetromino.rotation,
+                               position.x, position.y], dtype=np.int64),
+            "minos": minos,
+        }
+
+    def info(self):
+        return {"score": self.game.grid.score, "ticks": self.ticks,
+                "pieces": self.game.pieces, "n_placements": len(self.placements)}
+
+
+# An environment for n_envs games stepped together with the batch engine (see
+# the BatchGame class). An action is a key code per game (see batch.KEYS)
+# applied before one fall tick. The games that are over or that reach the tick
+# limit are started again at once, and their final scores are given in the
+# info dictionary.
+class VecTetrisEnv:
+    def __init__(self, n_envs, grid_h=20, grid_w=12, max_ticks=None, seed=None):
+        self.n_envs = n_envs
+        self.max_ticks = max_ticks
+        self.batch = BatchGame(n_envs, grid_h, grid_w, seed)
+
+    # Starts new games (seeded with the given seed, if any) and returns the
+    # observations and an info dictionary
+    def reset(self, seed=None):
+        if seed is not None:
+            self.batch.rng = np.random.default_rng(seed)
+        self.batch.reset()
+        return self.observation(), self.info()
+
+    # Applies one action per game and returns the observations, the rewards,
+    # which games are over, which games have reached the tick limit and an
+    # info dictionary with the final scores of these games
+    def step(self, actions):
+        batch = self.batch
+        score_before = batch.scores.copy()
+        batch.step(actions)
+        rewards = batch.scores - score_before
+        terminated = batch.game_over.copy()
+        truncated = np.zeros(self.n_envs, dtype=bool)
+        if self.max_ticks is not None:
+            truncated = ~terminated & (batch.ticks >= self.max_ticks)
+        done = terminated | truncated
+        info = self.info()
+        info["final_score"] = np.where(done, batch.scores, 0)
+        if done.any():
+            batch.reset(done)
+        return self.observation(), rewards, terminated, truncated, info
+
+    # Returns the observations of all the games as arrays with the game index
+    # as the first axis
+    def observation(self):
+        batch = self.batch
+        return {
+            "board": batch.boards.copy(),
+            "piece": np.stack([batch.piece_type, batch.rotation, batch.x, batch.y], axis=1),
+            "minos": batch.minos.copy(),
+        }
+
+    def info(self):
+        return {"score": self.batch.scores.copy(), "ticks": self.batch.ticks.copy()}
@@ -1,23 +1,23 @@
-import sys
-
-import time, math
 import lib.stddraw as stddraw
 from lib.color import Color
-from point import Point
+from tile import Tile
+from engine import Board
 import numpy as np
 
 
-class GameGrid:
-    def __init__(self, grid_h, grid_w):
-        self.grid_height = grid_h
-        self.grid_width = grid_w
-        self.tile_matrix = np.full((grid_h, grid_w), None)
-        self.current_tetromino = None
-        self.game_over = False
-        self.game_won = False
-        self.score = 0
-        self.doubled = False
-        self.quadrupled = False
+# the ways of drawing the tiles (see GameGrid.display)
+RENDERERS = ("sprites", "array")
+
+
+class GameGrid(Board):
+    def __init__(self, grid_h, grid_w, renderer="sprites"):
+        super().__init__(grid_h, grid_w)
+        if renderer not in RENDERERS:
+            raise ValueError("unknown renderer: " + str(renderer))
+        # "sprites" draws each tile from its sprite and redraws only the changed
+        # cells, "array" draws the whole grid at once from the tile colors (see
+        # display_array), which suits large grids better
+        self.renderer = renderer
         self.empty_cell_color = Color(54, 15, 80)
         self.line_color = Color(138 , 43, 226)
         self.boundary_color = Color(186, 85, 211)
@@ -27,21 +27,161 @@ class GameGrid:
         self.blink_duration = 0.4
         self.blink_highlight = Color(255, 87, 34)
         self.blink_scale_amt = 0.15
-
+        # the tile exponents of the cells (with the falling tetromino), the
+        # cells of the tetromino and the score text shown by the last display,
+        # and the canvas version after it (see stddraw.canvasVersion), for
+        # redrawing only the changed cells
+        self.drawn_frame = None
+        self.drawn_piece = None
+        self.drawn_score = None
+        self.drawn_version = None
+
+    # Draws the grid, the falling tetromino and the score. The whole canvas is
+    # drawn only when something else has been drawn on it since the last call
+    # (or the grid has not been drawn yet); otherwise only the cells that have
+    # changed are drawn again and updated on the screen.
     def display(self):
-        stddraw.clear(self.empty_cell_color)
-        self.draw_grid()
-        if self.current_tetromino is not None:
-            self.current_tetromino.draw()
-        self.draw_boundaries()
+        if self.renderer == "array":
+            self.display_array()
+            return
+        # the cells as they are drawn: the tiles of the grid with the tiles of
+        # the falling tetromino over them
+        tiles = self.exponent_matrix()
+        piece_exponents, piece = self.piece_matrix()
+        frame = np.where(piece, piece_exponents, tiles)
+        score_text = "score: " + str(self.score)
+        if self.drawn_frame is None or stddraw.canvasVersion() != self.drawn_version:
+            stddraw.drawLayer(self.layer("background"))
+            self.draw_grid()
+            if self.current_tetromino is not None:
+                self.current_tetromino.draw()
+            stddraw.drawLayer(self.layer("boundaries"))
+            self.draw_score()
+            stddraw.show(0)
+        else:
+            # the tetromino is drawn over the grid lines and the tiles of the
+            # grid under them, so a cell also changes when the tetromino locks
+            dirty = (frame != self.drawn_frame) | (piece != self.drawn_piece)
+            # the score is drawn over the cells under it, so these cells are
+            # drawn again together when the score or any of them changes
+            score_cells = self.text_cells(score_text) | self.text_cells(self.drawn_score)
+            if score_text != self.drawn_score or (dirty & score_cells).any():
+                dirty |= score_cells
+            if dirty.any():
+                self.draw_cells(tiles, frame, piece, dirty, score_cells)
+        self.drawn_frame = frame
+        self.drawn_piece = piece
+        self.drawn_score = score_text
+        self.drawn_version = stddraw.canvasVersion()
+
+    # Draws the grid, the falling tetromino and the score with the colors of all
+    # the cells looked up at once (see Tile.color_table) and scaled onto the
+    # canvas in one operation. Only the numbers of the tiles are drawn one by
+    # one (when the cells are large enough for them), so the time of a frame
+    # hardly depends on the number of tiles.
+    def display_array(self):
+        piece_exponents, piece = self.piece_matrix()
+        frame = np.where(piece, piece_exponents, self.exponent_matrix())
+        table = Tile.color_table(self.empty_cell_color)
+        # the rows of the image go from the top of the grid down
+        colors = table[np.minimum(frame[::-1], len(table) - 1)]
+        stddraw.drawArray(colors, -0.5, -0.5, self.grid_width, self.grid_height)
+        stddraw.drawLayer(self.layer("lines"))
+        if min(stddraw.toPixels(1, 1)) >= Tile.MIN_NUMBER_CELL_SIZE:
+            rows, cols = np.nonzero(frame)
+            values = frame[rows, cols].tolist()
+            numbers = {exponent: Tile.from_exponent(exponent).number_sprite() for exponent in set(values)}
+            stddraw.drawSprites([(numbers[exponent], col, row)
+                                 for row, col, exponent in zip(rows.tolist(), cols.tolist(), values)])
+        stddraw.drawLayer(self.layer("boundaries"))
         self.draw_score()
         stddraw.show(0)
 
+    # Returns the tile exponents of the tiles of the falling tetromino that are
+    # inside the grid (0 for the other cells) and a boolean matrix of their cells
+    def piece_matrix(self):
+        exponents = np.zeros((self.grid_height, self.grid_width), dtype=np.int64)
+        cells = np.zeros((self.grid_height, self.grid_width), dtype=bool)
+        tetromino = self.current_tetromino
+        if tetromino is not None:
+            for (row, col), exponent in zip(tetromino.shape.cells, tetromino.minos):
+                position = tetromino.get_cell_position(row, col)
+                if 0 <= position.y < self.grid_height and 0 <= position.x < self.grid_width:
+                    exponents[position.y, position.x] = exponent
+                    cells[position.y, position.x] = True
+        return exponents, cells
+
+    # Returns a boolean matrix of the cells under the given score text
+    def text_cells(self, text):
+        cells = np.zeros((self.grid_height, self.grid_width), dtype=bool)
+        if text is not None:
+            self.set_score_style()
+            text_w, text_h = stddraw.textExtent(text)
+            x, y = self.grid_width - 2, self.grid_height - 1
+            cols = slice(max(int(np.floor(x - text_w / 2 + 0.5)), 0),
+                         max(int(np.ceil(x + text_w / 2 + 0.5)), 0))
+            rows = slice(max(int(np.floor(y - text_h / 2 + 0.5)), 0),
+                         max(int(np.ceil(y + text_h / 2 + 0.5)), 0))
+            cells[rows, cols] = True
+        return cells
+
+    # Draws the cells marked in the boolean matrix dirty again (in the same
+    # order as display: the background, the tiles of the grid, the grid lines,
+    # the tetromino, the boundaries and the score) and updates only them on
+    # the screen. The marked cells are drawn in runs of consecutive cells in
+    # each row, with the drawing restricted to each run.
+    def draw_cells(self, tiles, frame, piece, dirty, score_cells):
+        regions = []
+        for row in np.flatnonzero(dirty.any(axis=1)).tolist():
+            cols = np.flatnonzero(dirty[row])
+            for run in np.split(cols, np.flatnonzero(np.diff(cols) > 1) + 1):
+                first, last = int(run[0]), int(run[-1])
+                x, y, w = first - 0.5, row - 0.5, last - first + 1
+                stddraw.setClip(x, y, w, 1)
+                stddraw.drawLayer(self.layer("background"))
+                stddraw.drawSprites([(Tile.from_exponent(tiles[row, col]).sprite(), col, row)
+                                     for col in range(first, last + 1) if tiles[row, col]])
+                stddraw.drawLayer(self.layer("lines"))
+                stddraw.drawSprites([(Tile.from_exponent(frame[row, col]).sprite(), col, row)
+                                     for col in range(first, last + 1)
+                                     if piece[row, col]])
+                stddraw.drawLayer(self.layer("boundaries"))
+                if score_cells[row, first:last + 1].any():
+                    self.draw_score()
+                regions.append((x, y, w, 1))
+        stddraw.clearClip()
+        stddraw.showRegions(regions)
+
+    # Returns one of the static layers of the grid (see stddraw.layer), which
+    # are drawn once for each grid size, set of colors and canvas scale:
+    # "background" (the empty cells with the grid lines and the boundaries),
+    # and "lines" and "boundaries" alone on a transparent surface, for drawing
+    # them over the tiles as the grid has always been drawn
+    def layer(self, name):
+        colors = tuple((color.getRed(), color.getGreen(), color.getBlue())
+                       for color in (self.empty_cell_color, self.line_color, self.boundary_color))
+        key = (name, self.grid_height, self.grid_width, colors,
+               self.line_thickness, self.box_thickness)
+        if name == "background":
+            return stddraw.layer(key, self.draw_background, self.empty_cell_color)
+        draw = self.draw_lines if name == "lines" else self.draw_boundaries
+        return stddraw.layer(key, draw, self.empty_cell_color, transparent=True)
+
+    def draw_background(self):
+        self.draw_lines()
+        self.draw_boundaries()
+
     def draw_grid(self):
-        for row in range(self.grid_height):
-            for col in range(self.grid_width):
-                if self.tile_matrix[row][col] is not None:
-                    self.tile_matrix[row][col].draw(Point(col, row))
+        # the tiles are copied from their sprites with one batched blit
+        exponents = self.exponent_matrix()
+        rows, cols = np.nonzero(exponents)
+        values = exponents[rows, cols].tolist()
+        sprites = {exponent: Tile.from_exponent(exponent).sprite() for exponent in set(values)}
+        stddraw.drawSprites([(sprites[exponent], col, row)
+                             for row, col, exponent in zip(rows.tolist(), cols.tolist(), values)])
+        stddraw.drawLayer(self.layer("lines"))
+
+    def draw_lines(self):
         stddraw.setPenColor(self.line_color)
         stddraw.setPenRadius(self.line_thickness)
         start_x, end_x = -0.5, self.grid_width - 0.5
@@ -59,153 +199,17 @@ class GameGrid:
         stddraw.rectangle(pos_x, pos_y, self.grid_width, self.grid_height)
         stddraw.setPenRadius()
 
-
-    def is_occupied(self, row, col):
-        if not self.is_inside(row, col):
-            return False  
-        return self.tile_matrix[row][col] is not None
-
-    def is_inside(self, row, col):
-        if row < 0 or row >= self.grid_height:
-            return False
-        if col < 0 or col >= self.grid_width:
-            return False
-        return True
-    
-    def update_grid(self, tiles_to_lock, blc_position):
-        self.current_tetromino
-        n_rows, n_cols = len(tiles_to_lock), len(tiles_to_lock[0])
-        for col in range(n_cols):
-            for row in range(n_rows):
-                if tiles_to_lock[row][col] is not None:
-                   pos = Point()
-                   pos.x = blc_position.x + col
-                   pos.y = blc_position.y + (n_rows - 1) - row
-                   if self.is_inside(pos.y, pos.x):
-                      self.tile_matrix[pos.y][pos.x] = tiles_to_lock[row][col]
-                   else:
-                       self.game_over = True
-        self.clear_and_move_down_rows()
-        return self.game_over               
-
-
-
-    def draw_score(self):
+    def set_score_style(self):
         stddraw.setFontSize(28)
         stddraw.setPenColor(stddraw.YELLOW)
         stddraw.setFontFamily("Arial")
+
+    def draw_score(self):
+        self.set_score_style()
         score_pos_x = self.grid_width - 2
         score_pos_y = self.grid_height - 1
         stddraw.text(score_pos_x, score_pos_y, "score: " + str(self.score))
 
-    def update_score(self, points):
-        self.score += points 
-        if self.score >= 200 and not self.doubled:
-            self.double_tiles_value() 
-            self.doubled = True  
-
-        elif self.score >= 16000 and not self.quadrupled:
-            self.double_tiles_value()
-            self.quadrupled = True 
-
-
-    def delete_free_tiles_and_update_score(self):
-        for col in range(self.grid_width): 
-            conqat = [False] * self.grid_height 
-            for row in range(self.grid_height - 1, -1, -1):
-                if self.tile_matrix[row][col] is not None:
-                    if row == self.grid_height - 1 or conqat[row + 1]: 
-                        conqat[row] = True
-                    else:
-                        self.update_score(self.tile_matrix[row][col].number)
-                        self.tile_matrix[row][col] = None
-
-
-    def clear_and_move_down_rows(self):
-        rows_cleared = 0
-        for row in range(self.grid_height):
-            if all(self.tile_matrix[row]):  
-                rows_cleared += 1
-            elif rows_cleared > 0:  
-                self.tile_matrix[row - rows_cleared] = self.tile_matrix[row].copy()
-                self.tile_matrix[row] = [None] * self.grid_width 
-
-        self.score += rows_cleared * 100
-
-    def merge_tiles(self):
-        for col in range(self.grid_width):
-            row = 0  
-            while row < self.grid_height - 1: 
-                current_tile = self.tile_matrix[row][col]
-                above_tile = self.tile_matrix[row + 1][col]
-
-                if current_tile is not None and above_tile is not None:
-                    if current_tile.number == above_tile.number:
-                        merged_number = current_tile.number * 2
-                        current_tile.number = merged_number
-                        self.tile_matrix[row + 1][col] = None  
-                        self.update_score(merged_number)  
-
-                        for r in range(row + 1, self.grid_height - 1):
-                            self.tile_matrix[r][col] = self.tile_matrix[r + 1][col]
-                        self.tile_matrix[self.grid_height - 1][col] = None
-                row += 1  
-        self.check_win()
-
-
-
-    def label_components(self):
-        label_count = 1
-        labels = {}
-
-        for col in range(self.grid_width):
-            for row in range(self.grid_height):
-                if self.tile_matrix[row][col] is not None and (row, col) not in labels:
-                    self.flood_fill(row, col, label_count, labels)
-                    label_count += 1
-        return labels
-
-
-    def flood_fill(self, row, col, label, labels):
-        stack = [(row, col)]
-        while stack:
-            r, c = stack.pop()
-            if (r, c) not in labels and self.tile_matrix[r][c] is not None:
-                labels[(r, c)] = label
-                if r > 0: stack.append((r - 1, c))
-                if r < self.grid_height - 1: stack.append((r + 1, c))
-                if c > 0: stack.append((r, c - 1))
-                if c < self.grid_width - 1: stack.append((r, c + 1))
-
-
-    def move_down_components(self, labels):
-        for label in set(labels.values()):
-            component = [loc for loc, lbl in labels.items() if lbl == label]
-            min_row = min(r for r, c in component)
-            if min_row == 0 or all(self.tile_matrix[r - 1][c] is not None for r, c in component):
-                continue
-            for r, c in component:
-                self.tile_matrix[r][c], self.tile_matrix[r - 1][c] = None, self.tile_matrix[r][c]
-
-
-
-    def double_tiles_value(self):
-        for row in range(self.grid_height):
-            for col in range(self.grid_width):
-                if self.tile_matrix[row][col] is not None: 
-                    self.tile_matrix[row][col].number *= 2
-                    self.tile_matrix[row][col].update_colors()
-
-
-    def check_win(self):
-        for row in range(self.grid_height):
-            for col in range(self.grid_width):
-                if self.tile_matrix[row][col] is not None and self.tile_matrix[row][col].number == 2048:
-                    self.game_won = True
-                    self.draw_game_won()
-                    return True
-        return False 
-
     def draw_game_won(self):
         while True:
             stddraw.clear(self.empty_cell_color)
@@ -246,11 +250,8 @@ class GameGrid:
                     print("Exit button clicked.")
 
     def reset_game(self):
-        self.game_over = False
-        self.game_won = False
-        self.score = 0
-        self.tile_matrix = np.full((self.grid_height, self.grid_width), None)
+        self.reset()
         self.display()  
 
 
-pass
\ No newline at end of file
+pass
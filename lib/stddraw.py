@@ -10,11 +10,13 @@ commonly used Color objects defined in the color module.
 import time
 import os
 import sys
+from collections import OrderedDict
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
 import pygame
 import pygame.gfxdraw
 import pygame.font
+import pygame.surfarray
 
 import tkinter as Tkinter
 import tkinter.messagebox as tkMessageBox
@@ -100,6 +102,27 @@ _keysTyped = []
 # Has the window been created?
 _windowCreated = False
 
+# The fonts created by pygame.font.SysFont, keyed by (family, size, bold),
+# and the surfaces of the short strings rendered with them, keyed by
+# (family, size, bold, string, color). SysFont looks the font up among the
+# system fonts on every call, and the same few strings (the tile numbers and
+# the score) are drawn on every frame. Both caches drop their least recently
+# used entries when they are full.
+_FONT_CACHE_SIZE = 32
+_TEXT_CACHE_SIZE = 512
+_TEXT_CACHE_MAX_LENGTH = 16
+_fontCache = OrderedDict()
+_textCache = OrderedDict()
+
+# The surfaces of the sprites (see sprite), keyed by the key given by the
+# caller and their size in pixels. They are dropped whenever the size or the
+# scale of the canvas changes.
+_spriteCache = {}
+
+# The number of times the canvas has been resized, rescaled, cleared or
+# shown in full (see canvasVersion)
+_canvasVersion = 0
+
 #-----------------------------------------------------------------------
 # Begin added by Alan J. Broder
 #-----------------------------------------------------------------------
@@ -184,7 +207,9 @@ def setCanvasSize(w=_DEFAULT_CANVAS_SIZE, h=_DEFAULT_CANVAS_SIZE):
     pygame.display.set_caption('stddraw window (r-click to save)')
     _surface = pygame.Surface((w, h))
     _surface.fill(_pygameColor(WHITE))
+    _spriteCache.clear()
     _windowCreated = True
+    _canvasChanged()
 
 def setXscale(min=_DEFAULT_XMIN, max=_DEFAULT_XMAX):
     """
@@ -200,6 +225,8 @@ def setXscale(min=_DEFAULT_XMIN, max=_DEFAULT_XMAX):
     size = max - min
     _xmin = min - _BORDER * size
     _xmax = max + _BORDER * size
+    _spriteCache.clear()
+    _canvasChanged()
 
 def setYscale(min=_DEFAULT_YMIN, max=_DEFAULT_YMAX):
     """
@@ -215,6 +242,8 @@ def setYscale(min=_DEFAULT_YMIN, max=_DEFAULT_YMAX):
     size = max - min
     _ymin = min - _BORDER * size
     _ymax = max + _BORDER * size
+    _spriteCache.clear()
+    _canvasChanged()
 
 def setPenRadius(r=_DEFAULT_PEN_RADIUS):
     """
@@ -480,6 +509,50 @@ def filledPolygon(x, y):
     points.append((xScaled[0], yScaled[0]))
     pygame.draw.polygon(_surface, _pygameColor(_penColor), points, 0)
 
+def _getFont(family, size, bold=False):
+    """
+    Return the pygame font with the given family, size and boldness,
+    creating it only when it is not in the font cache.
+    """
+    key = (family, size, bold)
+    font = _fontCache.get(key)
+    if font is None:
+        font = pygame.font.SysFont(family, size, bold)
+        _fontCache[key] = font
+        if len(_fontCache) > _FONT_CACHE_SIZE:
+            _fontCache.popitem(last=False)
+    else:
+        _fontCache.move_to_end(key)
+    return font
+
+def _renderText(s, bold=False):
+    """
+    Return a surface with string s rendered in the current font and pen
+    color. The surfaces of short strings are kept in the text cache.
+    """
+    if len(s) > _TEXT_CACHE_MAX_LENGTH:
+        font = _getFont(_fontFamily, _fontSize, bold)
+        return font.render(s, 1, _pygameColor(_penColor))
+    color = (_penColor.getRed(), _penColor.getGreen(), _penColor.getBlue())
+    key = (_fontFamily, _fontSize, bold, s, color)
+    surface = _textCache.get(key)
+    if surface is None:
+        font = _getFont(_fontFamily, _fontSize, bold)
+        surface = font.render(s, 1, pygame.Color(*color))
+        _textCache[key] = surface
+        if len(_textCache) > _TEXT_CACHE_SIZE:
+            _textCache.popitem(last=False)
+    else:
+        _textCache.move_to_end(key)
+    return surface
+
+def clearFontCache():
+    """
+    Empty the font and text caches (e.g. after installing new fonts).
+    """
+    _fontCache.clear()
+    _textCache.clear()
+
 def text(x, y, s):
     """
     Draw string s on the background canvas centered at (x, y).
@@ -489,8 +562,7 @@ def text(x, y, s):
     y = float(y)
     xs = _scaleX(x)
     ys = _scaleY(y)
-    font = pygame.font.SysFont(_fontFamily, _fontSize)
-    text = font.render(s, 1, _pygameColor(_penColor))
+    text = _renderText(s)
     textpos = text.get_rect(center=(xs, ys))
     _surface.blit(text, textpos)
 
@@ -503,8 +575,7 @@ def boldText(x, y, s):
     y = float(y)
     xs = _scaleX(x)
     ys = _scaleY(y)
-    font = pygame.font.SysFont(_fontFamily, _fontSize, True)
-    text = font.render(s, 1, _pygameColor(_penColor))
+    text = _renderText(s, True)
     textpos = text.get_rect(center=(xs, ys))
     _surface.blit(text, textpos)
 
@@ -530,6 +601,187 @@ def picture(pic, x=None, y=None):
     picSurface = pic._surface # violates encapsulation
     _surface.blit(picSurface, [xs-ws/2.0, ys-hs/2.0, ws, hs])
 
+def sprite(key, w, h, draw):
+    """
+    Return a surface with a sprite w wide and h high (in the units of
+    the x and y scales) drawn by calling draw(), with the drawing
+    functions directed onto the sprite and its center at (0, 0). The
+    sprite is drawn only the first time for each key and size in pixels.
+    """
+    _makeSureWindowCreated()
+    ws = max(int(round(_factorX(w))), 1)
+    hs = max(int(round(_factorY(h))), 1)
+    cacheKey = (key, ws, hs)
+    surface = _spriteCache.get(cacheKey)
+    if surface is None:
+        surface = pygame.Surface((ws, hs))
+        _drawOnto(surface, draw, -w / 2.0, w / 2.0, -h / 2.0, h / 2.0)
+        _spriteCache[cacheKey] = surface
+    return surface
+
+def layer(key, draw, c=WHITE, transparent=False):
+    """
+    Return a surface of the size of the canvas, filled with color c and
+    then drawn by calling draw() with the drawing functions directed
+    onto it (with the scales of the canvas). If transparent is True,
+    the pixels of color c are left out when the surface is drawn. The
+    layer is drawn only the first time for each key and canvas size and
+    scale.
+    """
+    _makeSureWindowCreated()
+    cacheKey = ('layer', key, transparent, _surface.get_size())
+    surface = _spriteCache.get(cacheKey)
+    if surface is None:
+        surface = pygame.Surface(_surface.get_size())
+        surface.fill(_pygameColor(c))
+        _drawOnto(surface, draw, _xmin, _xmax, _ymin, _ymax)
+        if transparent:
+            surface.set_colorkey(_pygameColor(c), pygame.RLEACCEL)
+        _spriteCache[cacheKey] = surface
+    return surface
+
+def drawLayer(surface):
+    """
+    Draw surface (e.g. a layer) on the background canvas with its upper
+    left corner at the upper left corner of the canvas.
+    """
+    _makeSureWindowCreated()
+    _surface.blit(surface, (0, 0))
+
+def drawArray(a, x, y, w, h):
+    """
+    Draw the image in a, a NumPy array of (r, g, b) values with one row
+    for each row of pixels from the top, scaled to fill the rectangle of
+    width w and height h whose lower left point is (x, y). The image is
+    copied and scaled in one operation each, whatever it shows.
+    """
+    _makeSureWindowCreated()
+    rows, cols = a.shape[:2]
+    cacheKey = ('array', cols, rows)
+    image = _spriteCache.get(cacheKey)
+    if image is None:
+        image = pygame.Surface((cols, rows))
+        _spriteCache[cacheKey] = image
+    pygame.surfarray.blit_array(image, a.swapaxes(0, 1))
+    rect = _pixelRect(x, y, w, h)
+    if _surface.get_rect().contains(rect) and _surface.get_clip() == _surface.get_rect():
+        pygame.transform.scale(image, rect.size, _surface.subsurface(rect))
+    else:
+        _surface.blit(pygame.transform.scale(image, rect.size), rect)
+
+def toPixels(w, h):
+    """
+    Return the width and the height in pixels of w by h units of the x
+    and y scales.
+    """
+    return (_factorX(w), _factorY(h))
+
+def textSurface(s, bold=False):
+    """
+    Return a surface with string s rendered in the current font and pen
+    color on a transparent background (e.g. for drawSprites). The
+    surface may be shared with the text cache, so it must not be
+    changed.
+    """
+    return _renderText(s, bold)
+
+def _drawOnto(surface, draw, xmin, xmax, ymin, ymax):
+    """
+    Call draw() with the drawing functions directed onto surface, with
+    the x scale from xmin to xmax and the y scale from ymin to ymax.
+    The canvas, the scales, the pen and the font are restored
+    afterwards.
+    """
+    global _surface, _canvasWidth, _canvasHeight
+    global _xmin, _xmax, _ymin, _ymax
+    global _penColor, _penRadius, _fontFamily, _fontSize
+    saved = (_surface, _canvasWidth, _canvasHeight, _xmin, _xmax, _ymin,
+        _ymax, _penColor, _penRadius, _fontFamily, _fontSize)
+    _surface = surface
+    _canvasWidth, _canvasHeight = surface.get_size()
+    _xmin, _xmax = xmin, xmax
+    _ymin, _ymax = ymin, ymax
+    try:
+        draw()
+    finally:
+        (_surface, _canvasWidth, _canvasHeight, _xmin, _xmax, _ymin,
+            _ymax, _penColor, _penRadius, _fontFamily, _fontSize) = saved
+
+def _spritePosition(surface, x, y):
+    """
+    Return the pixel position of the upper left corner of surface when
+    it is centered at (x, y).
+    """
+    w, h = surface.get_size()
+    return (int(round(_scaleX(x) - w / 2.0)), int(round(_scaleY(y) - h / 2.0)))
+
+def drawSprite(surface, x, y):
+    """
+    Draw surface (e.g. a sprite) on the background canvas centered at
+    (x, y).
+    """
+    _makeSureWindowCreated()
+    _surface.blit(surface, _spritePosition(surface, x, y))
+
+def drawSprites(sprites):
+    """
+    Draw the surfaces of the (surface, x, y) tuples in sprites on the
+    background canvas, each centered at its (x, y), with a single
+    batched blit.
+    """
+    _makeSureWindowCreated()
+    _surface.blits([(surface, _spritePosition(surface, x, y))
+        for surface, x, y in sprites], False)
+
+def _canvasChanged():
+    global _canvasVersion
+    _canvasVersion += 1
+
+def canvasVersion():
+    """
+    Return a number that changes whenever the canvas is resized,
+    rescaled, cleared or shown in full. A client that redraws only
+    parts of the canvas (see showRegions) can compare it with the
+    number returned after its last full drawing to find out whether
+    anything else has been drawn since.
+    """
+    return _canvasVersion
+
+def _pixelRect(x, y, w, h):
+    """
+    Return the pygame.Rect of the pixels covered by the rectangle of
+    width w and height h whose lower left point is (x, y).
+    """
+    left = int(round(_scaleX(x)))
+    right = int(round(_scaleX(x + w)))
+    top = int(round(_scaleY(y + h)))
+    bottom = int(round(_scaleY(y)))
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+def setClip(x, y, w, h):
+    """
+    Restrict the drawing on the background canvas to the rectangle of
+    width w and height h whose lower left point is (x, y).
+    """
+    _makeSureWindowCreated()
+    _surface.set_clip(_pixelRect(x, y, w, h))
+
+def clearClip():
+    """
+    Allow drawing on the whole background canvas again.
+    """
+    _makeSureWindowCreated()
+    _surface.set_clip(None)
+
+def textExtent(s):
+    """
+    Return the width and the height of string s drawn with the current
+    font, in the units of the x and y scales.
+    """
+    ws, hs = _renderText(s).get_size()
+    return (ws * (_xmax - _xmin) / _canvasWidth,
+        hs * (_ymax - _ymin) / _canvasHeight)
+
 def clear(c=WHITE):
     """
     Clear the background canvas to color c, where c is an
@@ -537,6 +789,7 @@ def clear(c=WHITE):
     """
     _makeSureWindowCreated()
     _surface.fill(_pygameColor(c))
+    _canvasChanged()
 
 def save(f):
     """
@@ -564,6 +817,21 @@ def _show():
     """
     _background.blit(_surface, (0, 0))
     pygame.display.flip()
+    _canvasChanged()
+    _checkForEvents()
+
+def showRegions(regions):
+    """
+    Copy the given regions of the background canvas to the window
+    canvas and update only them on the screen. regions is a list of
+    (x, y, w, h) tuples, each a rectangle of width w and height h whose
+    lower left point is (x, y).
+    """
+    _makeSureWindowCreated()
+    rects = [_pixelRect(x, y, w, h) for x, y, w, h in regions]
+    for rect in rects:
+        _background.blit(_surface, rect, rect)
+    pygame.display.update(rects)
     _checkForEvents()
 
 def _showAndWaitForever():
@@ -0,0 +1,141 @@
+################################################################################
+#                                                                              #
+# Finding every placement of the falling tetromino: the positions where it     #
+# comes to rest that can be reached from its current position with the left,   #
+# right, down and rotate moves (on the current tiles of the grid). The states  #
+# (x, y, rotation) of the tetromino are searched breadth first, testing the    #
+# rows of the tetromino against the row bitmasks of the grid with the same    #
+# tests as Piece.can_be_moved (Orientation.fits and Orientation.box_fits), so  #
+# each placement comes with a shortest move sequence.                          #
+#                                                                              #
+################################################################################
+
+from collections import deque  # the queue of the breadth-first search
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import ORIENTATIONS, clear_full_rows
+from zobrist import TranspositionTable
+
+# the reachable resting states found for each grid and tetromino position,
+# keyed by the grid size and Board.zobrist_hash(tetromino) (the tiles, the type
+# and the position)
+PLACEMENT_CACHE = TranspositionTable(1 << 12)
+
+
+# A class for a placement of a tetromino: the position of its bottom left cell
+# and its rotation state when it comes to rest, the keys that move it there
+# ("left", "right", "down" and "up" for rotating), and the tile exponents of
+# the grid after the tetromino is locked and the full rows are cleared
+class Placement:
+    def __init__(self, x, y, rotation, moves):
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.moves = moves
+        self.board = None
+        self.rows_cleared = 0
+        # whether a tile of the tetromino is above the grid (the game is over)
+        self.game_over = False
+
+    # Returns the keys that move the tetromino to this placement, with the moves
+    # down at the end replaced by a hard drop ('s')
+    def keys(self):
+        moves = list(self.moves)
+        while moves and moves[-1] == "down":
+            moves.pop()
+        return moves + ['s']
+
+
+# Returns the (x, y, rotation, moves) tuples of the resting states that the
+# given tetromino can reach on the given grid, in the order they are found
+def find_resting_states(grid, tetromino):
+    grid_h, grid_w = grid.grid_height, grid.grid_width
+    grid_masks = grid.row_masks
+    orientations = ORIENTATIONS[tetromino.type]
+    can_rotate = tetromino.type != 'O'
+
+    # the test of Piece.can_be_moved for a move to (x, y)
+    def fits(x, y, rotation):
+        return orientations[rotation].fits(grid_masks, x, y, grid_w, grid_h)
+
+    position = tetromino.bottom_left_cell
+    start = (position.x, position.y, tetromino.rotation)
+    parents = {start: None}
+    queue = deque([start])
+    resting = []
+    while queue:
+        state = queue.popleft()
+        x, y, rotation = state
+        if not fits(x, y - 1, rotation):
+            resting.append(state)
+        for move, successor in (("left", (x - 1, y, rotation)), ("right", (x + 1, y, rotation)),
+                                ("down", (x, y - 1, rotation))):
+            if successor not in parents and fits(*successor):
+                parents[successor] = (state, move)
+                queue.append(successor)
+        if can_rotate and orientations[rotation].box_fits(grid_masks, x, y, grid_w, grid_h):
+            successor = (x, y, (rotation + 1) % 4)
+            if successor not in parents:
+                parents[successor] = (state, "up")
+                queue.append(successor)
+    results = []
+    for state in resting:
+        moves, step = [], parents[state]
+        while step is not None:
+            moves.append(step[1])
+            step = parents[step[0]]
+        results.append(state + (moves[::-1],))
+    return results
+
+
+# Returns the distinct placements of the given tetromino on the given grid
+# (see the Placement class). The resting states are cached by the size and the
+# Zobrist hash of the grid and the tetromino (pass cache=None to skip the
+# cache).
+def find_placements(grid, tetromino, cache=PLACEMENT_CACHE):
+    states = None
+    if cache is not None:
+        key = (grid.grid_height, grid.grid_width, grid.zobrist_hash(tetromino))
+        states = cache.get(key)
+    if states is None:
+        states = find_resting_states(grid, tetromino)
+        if cache is not None:
+            cache.put(key, states)
+    if not states:
+        return []
+    placements = [Placement(x, y, rotation, list(moves)) for x, y, rotation, moves in states]
+    boards, rows_cleared, game_over = lock_all(grid.exponent_matrix(), tetromino,
+                                               [(p.x, p.y, p.rotation) for p in placements])
+    # different rotation states may leave the same tiles on the grid
+    distinct, seen = [], set()
+    for placement, board, cleared, over in zip(placements, boards, rows_cleared, game_over):
+        signature = board.tobytes()
+        if signature in seen:
+            continue
+        seen.add(signature)
+        placement.board = board
+        placement.rows_cleared = int(cleared)
+        placement.game_over = bool(over)
+        distinct.append(placement)
+    return distinct
+
+
+# Returns the tile exponents of the grid after locking the tetromino at each
+# of the given (x, y, rotation) states and clearing the full rows (as one
+# (n_states, h, w) array), the number of cleared rows and whether a tile was
+# above the grid, for all the states at once
+def lock_all(exponents, tetromino, states):
+    grid_h, grid_w = exponents.shape
+    orientations = ORIENTATIONS[tetromino.type]
+    n = orientations[0].n
+    states = np.array(states, dtype=np.int64).reshape(-1, 3)
+    cell_rows = np.array([shape.rows for shape in orientations])[states[:, 2]]
+    cell_cols = np.array([shape.cols for shape in orientations])[states[:, 2]]
+    rows = states[:, 1:2] + (n - 1) - cell_rows
+    cols = states[:, 0:1] + cell_cols
+    inside = rows < grid_h
+    boards = np.repeat(exponents[None].astype(np.uint8), len(states), axis=0)
+    index = np.repeat(np.arange(len(states))[:, None], rows.shape[1], axis=1)
+    minos = np.broadcast_to(tetromino.minos, rows.shape)
+    boards[index[inside], rows[inside], cols[inside]] = minos[inside]
+    boards, rows_cleared = clear_full_rows(boards)
+    return boards, rows_cleared, ~inside.all(axis=1)
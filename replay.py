@@ -0,0 +1,281 @@
+################################################################################
+#                                                                              #
+# Recording and replaying games of Tetris 2048. A replay stores the seed of    #
+# the random number generator of the game, the grid dimensions and the inputs  #
+# of the main loop (the typed keys and the fall ticks) with their times, so    #
+# that the game can be simulated again without a window.                      #
+#                                                                              #
+# File format (little-endian):                                                 #
+#   header: the magic bytes b"T2R1", the seed (uint64), the grid height and    #
+#           the grid width (uint16 each)                                       #
+#   events: one byte for the event code (see EVENTS) followed by the time in   #
+#           milliseconds since the previous event as a varint (7 bits per      #
+#           byte, the high bit is set on all the bytes but the last one)       #
+#                                                                              #
+# The checkpoints of a replay (snapshots of the whole game state taken every   #
+# CHECKPOINT_INTERVAL fall ticks) are saved next to it with the ".ckpt" suffix #
+# as the magic bytes b"T2C1" followed by one record per checkpoint: the tick,  #
+# the index of the next event and the size of the snapshot (uint32 each) and   #
+# the snapshot (see save_state). Seeking to a tick starts from the last        #
+# checkpoint before it.                                                        #
+#                                                                              #
+# Usage: python replay.py game.t2r [tick]                                      #
+#                                                                              #
+################################################################################
+
+import os  # for checking if a replay has a checkpoint file
+import random  # the random module is used for generating random values
+import struct  # for packing the header of the replay files
+import sys  # for the command line arguments
+import time  # for measuring the speed of the simulation
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import Board, Piece, Game, create_piece, sized_piece_class
+
+MAGIC = b"T2R1"
+HEADER = struct.Struct("<4sQHH")
+# the events of a replay, indexed by their codes: a fall tick, the keys handled
+# by Game.handle_key, any other typed key (it still moves the floating tiles
+# down) and the restart of the game from the game won screen
+EVENTS = ["fall", "left", "right", "down", "up", "s", "p", "other", "restart"]
+FALL, OTHER_KEY, RESTART = 0, EVENTS.index("other"), EVENTS.index("restart")
+
+CHECKPOINT_MAGIC = b"T2C1"
+CHECKPOINT_HEADER = struct.Struct("<III")
+CHECKPOINT_INTERVAL = 100
+# a game state: the grid dimensions, the score, the flags (doubled, quadrupled
+# and paused), the number of tetrominoes so far and the type, rotation, x, y
+# and number of tiles of the falling tetromino, followed by its tile exponents,
+# the tile exponents of the grid and the state of the random number generator
+STATE = struct.Struct("<HHqBI1sBhhB")
+# the state of a random.Random instance: whether there is a gauss_next value,
+# the value, then the 625 words of the Mersenne Twister state
+RNG_STATE = struct.Struct("<Bd")
+RNG_WORDS = 625
+
+
+# Returns a snapshot of the given game and of the random number generator that
+# creates its tetrominoes as bytes (the format is given by STATE above)
+def save_state(game, rng):
+    grid, tetromino = game.grid, game.current_tetromino
+    flags = grid.doubled | grid.quadrupled << 1 | game.paused << 2
+    data = bytearray(STATE.pack(grid.grid_height, grid.grid_width, grid.score, flags,
+                                game.pieces, tetromino.type.encode(), tetromino.rotation,
+                                tetromino.bottom_left_cell.x, tetromino.bottom_left_cell.y,
+                                len(tetromino.minos)))
+    data += tetromino.minos.tobytes()
+    data += grid.exponent_matrix().astype(np.uint8).tobytes()
+    version, words, gauss_next = rng.getstate()
+    data += RNG_STATE.pack(gauss_next is not None, gauss_next or 0.0)
+    data += np.array(words, dtype=np.uint32).tobytes()
+    return bytes(data)
+
+
+# Returns the game and the random number generator restored from a snapshot
+# made by save_state (the tetrominoes are created with piece_class)
+def load_state(data, piece_class=Piece):
+    (grid_h, grid_w, score, flags, pieces, shape, rotation,
+     x, y, n_minos) = STATE.unpack_from(data)
+    i = STATE.size
+    minos = np.frombuffer(data, dtype=np.uint8, count=n_minos, offset=i)
+    i += n_minos
+    tiles = np.frombuffer(data, dtype=np.uint8, count=grid_h * grid_w, offset=i)
+    i += grid_h * grid_w
+    has_gauss, gauss_next = RNG_STATE.unpack_from(data, i)
+    i += RNG_STATE.size
+    words = np.frombuffer(data, dtype=np.uint32, count=RNG_WORDS, offset=i)
+    piece_class = sized_piece_class(piece_class, grid_h, grid_w)
+    grid = Board(grid_h, grid_w)
+    grid.set_tile_matrix(tiles.reshape(grid_h, grid_w))
+    grid.score = score
+    grid.doubled, grid.quadrupled = bool(flags & 1), bool(flags & 2)
+    rng = random.Random()
+    game = Game(grid, lambda: create_piece(piece_class, rng))
+    # replace the tetromino created by Game with the saved one, and only then
+    # restore the state of the random number generator
+    game.current_tetromino = piece_class.from_state(shape.decode(), rotation, minos, x, y)
+    grid.current_tetromino = game.current_tetromino
+    game.pieces, game.paused = pieces, bool(flags & 4)
+    rng.setstate((3, tuple(int(word) for word in words), gauss_next if has_gauss else None))
+    return game, rng
+
+
+# A class for the seed, the grid dimensions and the events of a game, where
+# each event is an (event_code, time_ms) pair and time_ms is the time of the
+# event since the start of the game in milliseconds. The checkpoints are
+# (tick, event_index, snapshot) tuples, where event_index is the index of the
+# first event after the snapshot.
+class Replay:
+    def __init__(self, seed, grid_h, grid_w, events=None):
+        self.seed = seed
+        self.grid_height = grid_h
+        self.grid_width = grid_w
+        self.events = [] if events is None else events
+        self.checkpoints = []
+        self.start_time = None
+        # the number of fall ticks recorded so far
+        self.ticks = sum(code == FALL for code, time_ms in self.events)
+
+    # Adds an event ("fall", "restart" or a typed key) at the given time in
+    # seconds (time.time() by default)
+    def record(self, event, now=None):
+        if now is None:
+            now = time.time()
+        if self.start_time is None:
+            self.start_time = now
+        code = EVENTS.index(event) if event in EVENTS else OTHER_KEY
+        time_ms = max(int((now - self.start_time) * 1000), self.events[-1][1] if self.events else 0)
+        self.events.append((code, time_ms))
+        if code == FALL:
+            self.ticks += 1
+
+    # Adds a snapshot of the given game (and of the random number generator
+    # that creates its tetrominoes) after the last recorded event
+    def checkpoint(self, game, rng):
+        self.checkpoints.append((self.ticks, len(self.events), save_state(game, rng)))
+
+    # Returns the replay encoded in the file format described above
+    def to_bytes(self):
+        data = bytearray(HEADER.pack(MAGIC, self.seed, self.grid_height, self.grid_width))
+        last_time = 0
+        for code, time_ms in self.events:
+            data.append(code)
+            delta = time_ms - last_time
+            last_time = time_ms
+            while delta >= 0x80:
+                data.append((delta & 0x7F) | 0x80)
+                delta >>= 7
+            data.append(delta)
+        return bytes(data)
+
+    # Returns the replay decoded from the given bytes
+    @classmethod
+    def from_bytes(cls, data):
+        magic, seed, grid_h, grid_w = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a Tetris 2048 replay")
+        events, time_ms, i = [], 0, HEADER.size
+        while i < len(data):
+            code, delta, shift = data[i], 0, 0
+            i += 1
+            while True:
+                byte = data[i]
+                i += 1
+                delta |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            time_ms += delta
+            events.append((code, time_ms))
+        return cls(seed, grid_h, grid_w, events)
+
+    # Saves the replay to the given path and its checkpoints (if any) to the
+    # path with the ".ckpt" suffix
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+        if self.checkpoints:
+            with open(path + ".ckpt", "wb") as file:
+                file.write(CHECKPOINT_MAGIC)
+                for tick, event_index, snapshot in self.checkpoints:
+                    file.write(CHECKPOINT_HEADER.pack(tick, event_index, len(snapshot)))
+                    file.write(snapshot)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            replay = cls.from_bytes(file.read())
+        if os.path.exists(path + ".ckpt"):
+            with open(path + ".ckpt", "rb") as file:
+                data = file.read()
+            if data[:len(CHECKPOINT_MAGIC)] != CHECKPOINT_MAGIC:
+                raise ValueError("not a Tetris 2048 checkpoint file")
+            i = len(CHECKPOINT_MAGIC)
+            while i < len(data):
+                tick, event_index, size = CHECKPOINT_HEADER.unpack_from(data, i)
+                i += CHECKPOINT_HEADER.size
+                replay.checkpoints.append((tick, event_index, data[i:i + size]))
+                i += size
+        return replay
+
+    # Returns the game at the given fall tick (right after the fall) and
+    # whether it is over, simulated from the last checkpoint before the tick
+    def seek(self, tick, piece_class=Piece):
+        start_tick, start_event, start_snapshot = 0, 0, None
+        for checkpoint_tick, event_index, snapshot in self.checkpoints:
+            if checkpoint_tick > tick:
+                break
+            start_tick, start_event, start_snapshot = checkpoint_tick, event_index, snapshot
+        if start_snapshot is None:
+            game, rng = new_game(self, piece_class)
+        else:
+            game, rng = load_state(start_snapshot, piece_class)
+        return game, play(game, self.events[start_event:], tick - start_tick)
+
+
+# Returns a new game (see the Game class in the engine module) with the seed
+# and the grid dimensions of the given replay, and the random number generator
+# that creates its tetrominoes
+def new_game(replay, piece_class=Piece):
+    piece_class = sized_piece_class(piece_class, replay.grid_height, replay.grid_width)
+    rng = random.Random(replay.seed)
+    game = Game(Board(replay.grid_height, replay.grid_width),
+                lambda: create_piece(piece_class, rng))
+    return game, rng
+
+
+# Applies the given events to the game, stopping right after the given number
+# of fall ticks (if any). Returns True when the game is over.
+def play(game, events, ticks=None):
+    if ticks == 0:
+        return False
+    for code, time_ms in events:
+        if code == FALL:
+            if game.fall():
+                return True
+            if ticks is not None:
+                ticks -= 1
+                if ticks == 0:
+                    break
+        elif code == RESTART:
+            game.grid.reset()
+        else:
+            game.handle_key(None if code == OTHER_KEY else EVENTS[code])
+    return False
+
+
+# Simulates the game of the given replay without drawing anything and returns
+# the game and whether it is over. The checkpoints of the replay are replaced
+# with new ones every checkpoint_interval ticks when it is given.
+def simulate(replay, piece_class=Piece, checkpoint_interval=None):
+    game, rng = new_game(replay, piece_class)
+    if checkpoint_interval is None:
+        return game, play(game, replay.events)
+    replay.checkpoints = []
+    tick = 0
+    for event_index, (code, time_ms) in enumerate(replay.events):
+        if play(game, [(code, time_ms)]):
+            return game, True
+        if code == FALL:
+            tick += 1
+            if tick % checkpoint_interval == 0:
+                replay.checkpoints.append((tick, event_index + 1, save_state(game, rng)))
+    return game, False
+
+
+def main(argv):
+    replay = Replay.load(argv[1])
+    start_time = time.perf_counter()
+    if len(argv) > 2:
+        game, game_over = replay.seek(int(argv[2]))
+    else:
+        game, game_over = simulate(replay)
+    elapsed = time.perf_counter() - start_time
+    game_time = replay.events[-1][1] / 1000 if replay.events else 0
+    print("seed %d, %d events, %.1f s of play" % (replay.seed, len(replay.events), game_time))
+    print("score: %d%s" % (game.grid.score, " (game over)" if game_over else ""))
+    print("simulated in %.3f s (%.0fx real time)" % (elapsed, game_time / max(elapsed, 1e-9)))
+    print(game.grid.values()[::-1])
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,174 @@
+################################################################################
+#                                                                              #
+# A command-line runner that plays many headless games of Tetris 2048 in       #
+# parallel with a pool of worker processes. The final grids and the results    #
+# of the games are written by the workers into shared memory blocks, so that   #
+# no grid is pickled between the processes. The replays of the games can be    #
+# appended to an archive (see the archive module). The keys are chosen at      #
+# random, or by the beam search bot with the --bot option (see bot.py).        #
+#                                                                              #
+# Usage: python selfplay.py --games 1000 --workers 4 --seed 0                  #
+#        [--archive games.t2a] [--bot]                                         #
+#                                                                              #
+################################################################################
+
+import argparse  # for parsing the command line arguments
+import multiprocessing as mp  # for running the games in worker processes
+import os  # for finding the number of cores
+import random  # the random module is used for generating random values
+import time  # for measuring the throughput
+from multiprocessing import shared_memory
+import numpy as np  # the fundamental Python module for scientific computing
+from engine import Board, Piece, Game, create_piece, sized_piece_class
+from replay import Replay
+from archive import Archive
+from bot import BeamSearchBot
+
+# the keys that the self-play policy chooses from at each tick (None for no key)
+# and their weights
+POLICY_KEYS = [None, "left", "right", "down", "up", "s"]
+POLICY_WEIGHTS = [8, 3, 3, 2, 2, 1]
+# the columns of the results array
+SCORE, TICKS, PIECES, MAX_TILE = range(4)
+
+# the shared arrays of a worker process (set by _attach)
+_boards, _results, _blocks = None, None, []
+# the bot of a worker process (created for the first game played by the bot)
+_bot = None
+
+
+# Opens the shared memory blocks with the given names in a worker process
+def _attach(boards_name, results_name, n_games, grid_h, grid_w):
+    global _boards, _results, _blocks
+    _blocks = [shared_memory.SharedMemory(name=boards_name),
+               shared_memory.SharedMemory(name=results_name)]
+    _boards = np.ndarray((n_games, grid_h, grid_w), dtype=np.uint8, buffer=_blocks[0].buf)
+    _results = np.ndarray((n_games, 4), dtype=np.int64, buffer=_blocks[1].buf)
+
+
+# Plays the game with the given index to the end (or to max_ticks) and writes
+# its final grid and results into the shared arrays. Every game is seeded with
+# seed + index, so the results do not depend on which worker plays it. Returns
+# the replay of the game when record is set (the events of a headless game all
+# have the time 0). The keys are chosen by the bot when use_bot is set.
+def play_game(index, seed, grid_h, grid_w, max_ticks, record=False, use_bot=False):
+    global _bot
+    # the tetrominoes and the keys of the policy are drawn from separate
+    # streams, so that the pieces only depend on the seed (as in a replay)
+    rng = random.Random(seed + index)
+    policy_rng = random.Random("policy %d" % (seed + index))
+    piece_class = sized_piece_class(Piece, grid_h, grid_w)
+    board = Board(grid_h, grid_w)
+    game = Game(board, lambda: create_piece(piece_class, rng))
+    replay = Replay(seed + index, grid_h, grid_w) if record else None
+    if use_bot and _bot is None:
+        _bot = BeamSearchBot()
+    ticks, bot_piece = 0, 0
+    while ticks < max_ticks:
+        if use_bot:
+            keys = []
+            if game.pieces != bot_piece:
+                keys = _bot.keys(board, game.current_tetromino)
+                bot_piece = game.pieces
+        else:
+            key = policy_rng.choices(POLICY_KEYS, POLICY_WEIGHTS)[0]
+            keys = [] if key is None else [key]
+        for key in keys:
+            game.handle_key(key)
+            if record:
+                replay.record(key, 0)
+        ticks += 1
+        if record:
+            replay.record("fall", 0)
+        if game.fall():
+            break
+    _boards[index] = board.exponent_matrix()
+    _results[index] = board.score, ticks, game.pieces, board.max_tile()
+    return replay
+
+
+# Plays the games with the given indexes (run by the workers) and returns the
+# (index, replay) pairs of the games when record is set
+def _play_games(args):
+    indexes, seed, grid_h, grid_w, max_ticks, record, use_bot = args
+    replays = [(index, play_game(index, seed, grid_h, grid_w, max_ticks, record, use_bot))
+               for index in indexes]
+    return replays if record else len(indexes)
+
+
+# Plays n_games games with the given number of worker processes and returns
+# the final grids (as tile exponents), the results array (see the column names
+# above) and the elapsed time in seconds. The replays of the games are appended
+# to the archive with the given path (if any) in the order of the games.
+def run(n_games, workers, seed=0, grid_h=20, grid_w=12, max_ticks=100000, chunk_size=8,
+        archive_path=None, use_bot=False):
+    global _boards, _results, _blocks
+    boards_block = shared_memory.SharedMemory(create=True, size=max(1, n_games * grid_h * grid_w))
+    results_block = shared_memory.SharedMemory(create=True, size=max(1, n_games * 4 * 8))
+    try:
+        _attach(boards_block.name, results_block.name, n_games, grid_h, grid_w)
+        record = archive_path is not None
+        chunks = [(range(start, min(start + chunk_size, n_games)), seed, grid_h, grid_w,
+                   max_ticks, record, use_bot) for start in range(0, n_games, chunk_size)]
+        replays = []
+        start_time = time.perf_counter()
+        if workers > 1:
+            initargs = (boards_block.name, results_block.name, n_games, grid_h, grid_w)
+            with mp.Pool(workers, initializer=_attach, initargs=initargs) as pool:
+                for result in pool.imap_unordered(_play_games, chunks):
+                    if record:
+                        replays += result
+        else:
+            for chunk in chunks:
+                result = _play_games(chunk)
+                if record:
+                    replays += result
+        elapsed = time.perf_counter() - start_time
+        if record:
+            archive = Archive(archive_path)
+            for index, replay in sorted(replays, key=lambda pair: pair[0]):
+                archive.append(replay, int(_results[index, SCORE]))
+        return _boards.copy(), _results.copy(), elapsed
+    finally:
+        _boards, _results = None, None
+        for block in _blocks:
+            block.close()
+        _blocks = []
+        for block in (boards_block, results_block):
+            block.close()
+            block.unlink()
+
+
+# Prints the aggregate results of the games
+def report(results, elapsed):
+    scores, ticks = results[:, SCORE], results[:, TICKS]
+    print("games:      %d" % len(results))
+    print("score:      mean %.1f  median %.1f  min %d  max %d"
+          % (scores.mean(), np.median(scores), scores.min(), scores.max()))
+    print("length:     mean %.1f ticks  mean %.1f pieces"
+          % (ticks.mean(), results[:, PIECES].mean()))
+    tiles, counts = np.unique(results[:, MAX_TILE], return_counts=True)
+    print("max tiles:  " + "  ".join("%d: %d" % pair for pair in zip(tiles, counts)))
+    print("throughput: %.1f games/s  %.0f ticks/s  (%.2f s)"
+          % (len(results) / elapsed, ticks.sum() / elapsed, elapsed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play headless Tetris 2048 games in parallel.")
+    parser.add_argument("--games", type=int, default=100, help="number of games")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes")
+    parser.add_argument("--seed", type=int, default=0, help="base seed (game i uses seed + i)")
+    parser.add_argument("--height", type=int, default=20, help="grid height")
+    parser.add_argument("--width", type=int, default=12, help="grid width")
+    parser.add_argument("--max-ticks", type=int, default=100000, help="tick limit per game")
+    parser.add_argument("--archive", help="archive file for the replays of the games")
+    parser.add_argument("--bot", action="store_true", help="play with the beam search bot")
+    args = parser.parse_args(argv)
+    boards, results, elapsed = run(args.games, args.workers, args.seed, args.height,
+                                   args.width, args.max_ticks, archive_path=args.archive,
+                                   use_bot=args.bot)
+    report(results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
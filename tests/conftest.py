@@ -0,0 +1,51 @@
+# The modules of the game are at the top level of the repository
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from engine import Board, Piece, Game, create_piece, sized_piece_class
+
+
+# Plays seeded games (on a 10x6 grid for the even seeds and a 20x12 grid for the
+# odd ones) with random keys, calling check with the board at the start and
+# after every key and every fall tick
+@pytest.fixture
+def play_games():
+    def play(check, seeds=range(12), ticks=600):
+        for seed in seeds:
+            grid_h, grid_w = (20, 12) if seed % 2 else (10, 6)
+            rng = random.Random(seed)
+            piece_class = sized_piece_class(Piece, grid_h, grid_w)
+            game = Game(Board(grid_h, grid_w), lambda: create_piece(piece_class, rng))
+            check(game.grid)
+            for _ in range(ticks):
+                game.handle_key(rng.choice(["left", "right", "down", "up", "s", None, None]))
+                check(game.grid)
+                if game.fall():
+                    break
+                check(game.grid)
+    return play
+
+
+# Locks a tile onto an occupied cell at the top of a column of a 6x4 grid (the
+# tile is replaced) and moves the tiles under it down until they land, calling
+# check with the board after the lock and after every move. Returns the board.
+@pytest.fixture
+def lock_over_a_tile():
+    def play(check):
+        board = Board(6, 4)
+        tiles = np.zeros((6, 4), dtype=int)
+        tiles[0, 2], tiles[1, 2], tiles[5, 2] = 2, 1, 3
+        board.set_tile_matrix(tiles)
+        piece = Piece.from_state('.', 0, [2], 2, 5)
+        board.update_grid(piece.tile_matrix, piece.bottom_left_cell)
+        check(board)
+        for _ in range(5):
+            board.move_down_components()
+            check(board)
+        return board
+    return play
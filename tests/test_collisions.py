@@ -0,0 +1,22 @@
+################################################################################
+#                                                                              #
+# Tests of the row bitmasks of the grid used for the collision checks of the   #
+# tetrominoes (see Board.row_masks and Orientation.fits).                      #
+#                                                                              #
+################################################################################
+
+
+# Checks the row bitmasks of the board against the tile matrix
+def check_row_masks(board):
+    occupied = board.tile_matrix != 0
+    grid_h, grid_w = occupied.shape
+    assert board.row_masks == [sum(1 << c for c in range(grid_w) if occupied[r, c])
+                               for r in range(grid_h)]
+
+
+def test_row_masks_match_the_tiles_after_every_tick(play_games):
+    play_games(check_row_masks)
+
+
+def test_row_masks_after_locking_over_a_tile(lock_over_a_tile):
+    lock_over_a_tile(check_row_masks)
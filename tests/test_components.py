@@ -0,0 +1,52 @@
+################################################################################
+#                                                                              #
+# Tests of the connected groups of tiles tracked by the grid (see the          #
+# ComponentIndex class) against a flood fill of the tile matrix.               #
+#                                                                              #
+################################################################################
+
+
+# Returns the sets of the cells of the connected groups of the occupied cells
+# found by a flood fill of the given boolean matrix
+def flood_fill_groups(occupied):
+    grid_h, grid_w = occupied.shape
+    seen, groups = set(), set()
+    for row in range(grid_h):
+        for col in range(grid_w):
+            if not occupied[row, col] or (row, col) in seen:
+                continue
+            stack, group = [(row, col)], set()
+            while stack:
+                r, c = stack.pop()
+                if (r, c) in seen or not (0 <= r < grid_h and 0 <= c < grid_w) or not occupied[r, c]:
+                    continue
+                seen.add((r, c))
+                group.add((r, c))
+                stack += [(r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)]
+            groups.add(frozenset(group))
+    return groups
+
+
+# Checks the groups, the labels, the lowest rows and the floating groups of the
+# component index of the board against a flood fill
+def check_components(board):
+    occupied = board.tile_matrix != 0
+    components = board.components
+    components.refresh()
+    assert set(frozenset(cells) for cells in components.cells.values()) == flood_fill_groups(occupied)
+    assert ((components.labels != 0) == occupied).all()
+    for root, cells in components.cells.items():
+        assert all(components.find(components.labels[r, c]) == root for r, c in cells)
+        assert components.min_row[root] == min(r for r, c in cells)
+        assert (root in components.floating) == (components.min_row[root] > 0)
+
+
+def test_components_match_a_flood_fill_after_every_tick(play_games):
+    play_games(check_components)
+
+
+# The locked tile replaces the tile under it, so the column keeps three tiles
+# once the tiles under the locked one have fallen
+def test_locking_over_a_tile_replaces_it(lock_over_a_tile):
+    board = lock_over_a_tile(check_components)
+    assert (board.tile_matrix != 0).sum(axis=0).tolist() == [0, 0, 3, 0]
@@ -0,0 +1,43 @@
+################################################################################
+#                                                                              #
+# Tests of the gym-style environments (see the env module).                    #
+#                                                                              #
+################################################################################
+
+from engine import Piece
+from env import TetrisEnv
+from replay import Replay
+
+
+# Returns the (x, y) positions of the tetrominoes entering the grid of the env
+# over the given number of steps without a key
+def spawn_positions(env, steps=400):
+    positions, pieces = [], None
+    for _ in range(steps):
+        if env.game.pieces != pieces:
+            pieces = env.game.pieces
+            position = env.game.current_tetromino.bottom_left_cell
+            positions.append((position.x, position.y))
+        if env.step(0)[2]:
+            break
+    return positions
+
+
+def test_envs_with_different_grid_sizes_do_not_share_the_piece_size():
+    alone = TetrisEnv(20, 12, seed=3)
+    alone.reset()
+    expected = spawn_positions(alone)
+    wide, narrow = TetrisEnv(20, 12, seed=3), TetrisEnv(10, 6, seed=4)
+    wide.reset()
+    narrow.reset()
+    assert spawn_positions(wide) == expected
+    assert all(y == 19 for x, y in expected)
+    assert all(y == 9 for x, y in spawn_positions(narrow))
+
+
+def test_a_replay_does_not_change_the_piece_size_of_an_env():
+    env = TetrisEnv(20, 12, seed=5)
+    env.reset()
+    Replay(1, 10, 6).seek(0)
+    assert (Piece.grid_height, Piece.grid_width) == (None, None)
+    assert all(y == 19 for x, y in spawn_positions(env))
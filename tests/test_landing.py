@@ -0,0 +1,55 @@
+################################################################################
+#                                                                              #
+# Tests of the column heights of the grid and of the landing row of a hard     #
+# drop found from them (see Board.column_heights and Piece.get_landing_row).   #
+#                                                                              #
+################################################################################
+
+import random
+import numpy as np
+from engine import Board, Piece, ORIENTATIONS, SHAPES, sized_piece_class
+
+
+# Checks the column heights of the board against the tile matrix
+def check_column_heights(board):
+    occupied = board.tile_matrix != 0
+    grid_h, grid_w = occupied.shape
+    assert board.column_heights == [max([r + 1 for r in range(grid_h) if occupied[r, c]], default=0)
+                                    for c in range(grid_w)]
+
+
+def test_column_heights_match_the_tiles_after_every_tick(play_games):
+    play_games(check_column_heights)
+
+
+def test_column_heights_after_locking_over_a_tile(lock_over_a_tile):
+    lock_over_a_tile(check_column_heights)
+
+
+# The landing row equals the row reached by moving the tetromino down one row
+# at a time, on random grids (with overhangs) and random positions of every
+# type and rotation of tetromino that do not collide with the tiles
+def test_landing_row_matches_moving_down_one_row_at_a_time():
+    rng = random.Random(7)
+    checked = 0
+    for trial in range(10000):
+        grid_h, grid_w = rng.randint(4, 22), rng.randint(4, 13)
+        board = Board(grid_h, grid_w)
+        tiles = np.random.default_rng(trial).random((grid_h, grid_w)) < rng.random() * 0.6
+        board.set_tile_matrix(tiles.astype(np.uint8))
+        piece = sized_piece_class(Piece, grid_h, grid_w)(rng.choice(list(SHAPES)), rng)
+        piece.rotation = rng.randint(0, 3)
+        piece.shape = shape = ORIENTATIONS[piece.type][piece.rotation]
+        position = piece.bottom_left_cell
+        position.x = rng.randint(-shape.min_col, grid_w - 1 - shape.max_col)
+        position.y = rng.randint(-(shape.n - 1 - shape.max_row), grid_h + 1)
+        if any(board.is_occupied(position.y + shape.n - 1 - r, position.x + c) for r, c in shape.cells):
+            continue
+        start_row = position.y
+        landing_row = piece.get_landing_row(board)
+        assert position.y == start_row
+        while piece.move("down", board):
+            pass
+        assert landing_row == position.y
+        checked += 1
+    assert checked > 5000
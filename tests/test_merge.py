@@ -0,0 +1,113 @@
+################################################################################
+#                                                                              #
+# Differential tests of the vectorized merging (merge_columns and              #
+# Board.merge_tiles) against a port of the original per-cell loop of           #
+# GameGrid.merge_tiles, on seeded random grids and with scores on both sides   #
+# of the doubling thresholds (200 and 16000).                                  #
+#                                                                              #
+################################################################################
+
+import numpy as np
+from engine import Board, merge_columns, exponents_to_numbers
+
+
+# The original merging loop on a grid of tile numbers (0 for an empty cell,
+# row 0 at the bottom), with the scoring and the doubling of update_score.
+# Returns the numbers, the score, the doubling flags and whether a tile is 2048.
+def reference_merge(numbers, score=0, doubled=False, quadrupled=False):
+    grid = [list(row) for row in numbers]
+    grid_h, grid_w = len(grid), len(grid[0])
+    state = {"score": score, "doubled": doubled, "quadrupled": quadrupled}
+
+    def double_tiles_value():
+        for row in range(grid_h):
+            for col in range(grid_w):
+                grid[row][col] *= 2
+
+    def update_score(points):
+        state["score"] += points
+        if state["score"] >= 200 and not state["doubled"]:
+            double_tiles_value()
+            state["doubled"] = True
+        elif state["score"] >= 16000 and not state["quadrupled"]:
+            double_tiles_value()
+            state["quadrupled"] = True
+
+    for col in range(grid_w):
+        row = 0
+        while row < grid_h - 1:
+            current, above = grid[row][col], grid[row + 1][col]
+            if current and above and current == above:
+                grid[row][col] = current * 2
+                grid[row + 1][col] = 0
+                update_score(grid[row][col])
+                for r in range(row + 1, grid_h - 1):
+                    grid[r][col] = grid[r + 1][col]
+                grid[grid_h - 1][col] = 0
+            row += 1
+    won = any(number == 2048 for row in grid for number in row)
+    return grid, state["score"], state["doubled"], state["quadrupled"], won
+
+
+# Returns a seeded random grid of tile exponents with many equal neighbors in
+# the columns (small exponents, with the empty cells above the tiles)
+def random_exponents(rng, grid_h, grid_w, max_exponent=4):
+    exponents = rng.integers(1, max_exponent + 1, size=(grid_h, grid_w))
+    heights = rng.integers(0, grid_h + 1, size=grid_w)
+    exponents[np.arange(grid_h).reshape(-1, 1) >= heights] = 0
+    return exponents
+
+
+def test_merge_columns_matches_the_original_loop():
+    rng = np.random.default_rng(2048)
+    for _ in range(2000):
+        grid_h, grid_w = rng.integers(2, 12), rng.integers(1, 8)
+        exponents = random_exponents(rng, grid_h, grid_w)
+        # no doubling during the merges (both thresholds already passed)
+        expected = reference_merge(exponents_to_numbers(exponents).tolist(), 20000, True, True)[0]
+        merged, merges = merge_columns(exponents)
+        assert exponents_to_numbers(merged).tolist() == expected
+        assert merges.shape == (grid_h - 1, grid_w)
+
+
+def test_merge_columns_of_a_batch_matches_each_grid():
+    rng = np.random.default_rng(16000)
+    batch = np.array([random_exponents(rng, 10, 6) for _ in range(64)])
+    merged, merges = merge_columns(batch)
+    for k in range(len(batch)):
+        single_merged, single_merges = merge_columns(batch[k])
+        assert (merged[k] == single_merged).all()
+        assert (merges[k] == single_merges).all()
+
+
+def test_merge_tiles_matches_the_original_loop_around_the_doubling_thresholds():
+    rng = np.random.default_rng(11)
+    # scores below, at and above each threshold, with the flags as they would be
+    starts = [(0, False, False), (150, False, False), (190, False, False),
+              (199, False, False), (200, True, False), (15900, True, False),
+              (15990, True, False), (15999, True, False), (16000, True, True)]
+    for score, doubled, quadrupled in starts:
+        for _ in range(300):
+            grid_h, grid_w = rng.integers(2, 10), rng.integers(1, 7)
+            exponents = random_exponents(rng, grid_h, grid_w, max_exponent=6)
+            expected = reference_merge(exponents_to_numbers(exponents).tolist(),
+                                       score, doubled, quadrupled)
+            board = Board(grid_h, grid_w)
+            board.set_tile_matrix(exponents)
+            board.score, board.doubled, board.quadrupled = score, doubled, quadrupled
+            board.merge_tiles()
+            assert board.values().tolist() == expected[0]
+            assert (board.score, board.doubled, board.quadrupled, board.game_won) == expected[1:]
+
+
+def test_merge_tiles_doubles_in_the_middle_of_the_merges():
+    # the first merge crosses 200, so the second pair is doubled before it
+    # merges and is scored at the doubled value
+    board = Board(4, 2)
+    board.set_tile_matrix([[1, 2], [1, 2], [0, 0], [0, 0]])
+    board.score = 196
+    board.merge_tiles()
+    assert board.doubled and not board.quadrupled
+    assert board.values().tolist() == [[8, 16], [0, 0], [0, 0], [0, 0]]
+    expected = reference_merge([[2, 4], [2, 4], [0, 0], [0, 0]], 196)
+    assert board.values().tolist() == expected[0] and board.score == expected[1]
@@ -0,0 +1,51 @@
+################################################################################
+#                                                                              #
+# Tests of the placement search (see the placements module).                   #
+#                                                                              #
+################################################################################
+
+import copy
+import random
+import numpy as np
+from engine import Board, Piece, SPAWN_TYPES
+from placements import find_placements, find_resting_states
+from zobrist import TranspositionTable
+
+
+def test_the_cache_keeps_the_placements_of_each_grid_size_apart():
+    cache = TranspositionTable(16)
+    wide = find_placements(Board(20, 12), Piece.from_state('T', 0, [1, 1, 1, 1], 3, 19), cache)
+    narrow = find_placements(Board(20, 8), Piece.from_state('T', 0, [1, 1, 1, 1], 3, 19), cache)
+    assert len(cache) == 2
+    assert all(placement.board.shape == (20, 8) for placement in narrow)
+    assert max(placement.x for placement in narrow) < max(placement.x for placement in wide)
+    uncached = find_placements(Board(20, 8), Piece.from_state('T', 0, [1, 1, 1, 1], 3, 19), None)
+    assert [(p.x, p.y, p.rotation) for p in narrow] == [(p.x, p.y, p.rotation) for p in uncached]
+
+
+def test_the_default_cache_with_different_grid_sizes():
+    for grid_w in (12, 8, 12):
+        placements = find_placements(Board(20, grid_w), Piece.from_state('T', 0, [1, 1, 1, 1], 3, 19))
+        assert placements and all(p.board.shape == (20, grid_w) for p in placements)
+
+
+# The moves of every resting state, replayed with the Piece methods, reach the
+# state and leave the tetromino unable to move down
+def test_the_moves_of_each_resting_state_agree_with_the_piece_moves():
+    rng = np.random.default_rng(17)
+    shapes = random.Random(17)
+    for _ in range(60):
+        board = Board(12, 8)
+        tiles = rng.integers(1, 4, size=(12, 8))
+        heights = rng.integers(0, 7, size=8)
+        tiles[np.arange(12).reshape(-1, 1) >= heights] = 0
+        board.set_tile_matrix(tiles)
+        piece = Piece.from_state(shapes.choice(SPAWN_TYPES), 0, [1, 1, 1, 1], shapes.randint(0, 4), 9)
+        piece.minos = piece.minos[:len(piece.shape.cells)]
+        for x, y, rotation, moves in find_resting_states(board, piece):
+            moved = copy.deepcopy(piece)
+            for move in moves:
+                assert moved.rotate(board) if move == "up" else moved.move(move, board)
+            position = moved.bottom_left_cell
+            assert (position.x, position.y, moved.rotation) == (x, y, rotation)
+            assert not moved.can_be_moved("down", board)
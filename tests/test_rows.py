@@ -0,0 +1,74 @@
+################################################################################
+#                                                                              #
+# Tests of the tile counts of the rows and of clearing the full rows (see      #
+# Board.row_counts, Board.clear_and_move_down_rows and clear_full_rows)        #
+# against the original row by row loop.                                        #
+#                                                                              #
+################################################################################
+
+import numpy as np
+from engine import Board, clear_full_rows
+
+
+# The original loop of clear_and_move_down_rows on a grid of tile exponents (0
+# for an empty cell, row 0 at the bottom). Returns the grid and the number of
+# full rows.
+def reference_clear(exponents):
+    grid = exponents.copy()
+    rows_cleared = 0
+    for row in range(len(grid)):
+        if grid[row].all():
+            rows_cleared += 1
+        elif rows_cleared > 0:
+            grid[row - rows_cleared] = grid[row]
+            grid[row] = 0
+    return grid, rows_cleared
+
+
+# Returns a seeded random grid of tile exponents where a cell is empty with a
+# random probability (up to 0.3), so that many grids have full rows
+def random_exponents(rng):
+    grid_h, grid_w = int(rng.integers(1, 25)), int(rng.integers(1, 13))
+    exponents = rng.integers(1, 4, size=(grid_h, grid_w))
+    exponents[rng.random((grid_h, grid_w)) < rng.random() * 0.3] = 0
+    return exponents
+
+
+# Checks the row counts and the number of full rows of the board
+def check_row_counts(board):
+    occupied = board.tile_matrix != 0
+    assert board.row_counts == occupied.sum(axis=1).tolist()
+    assert board.full_rows == int((occupied.sum(axis=1) == occupied.shape[1]).sum())
+
+
+def test_row_counts_match_the_tiles_after_every_tick(play_games):
+    play_games(check_row_counts)
+
+
+def test_row_counts_after_locking_over_a_tile(lock_over_a_tile):
+    lock_over_a_tile(check_row_counts)
+
+
+def test_clear_and_move_down_rows_matches_the_original_loop():
+    rng = np.random.default_rng(0)
+    for _ in range(20000):
+        exponents = random_exponents(rng)
+        expected, rows_cleared = reference_clear(exponents)
+        board = Board(*exponents.shape)
+        board.set_tile_matrix(exponents)
+        board.score = 5
+        assert board.clear_and_move_down_rows() == rows_cleared
+        assert (board.exponent_matrix() == expected).all()
+        assert board.score == 5 + 100 * rows_cleared
+        check_row_counts(board)
+
+
+def test_clear_full_rows_of_a_batch_matches_the_original_loop():
+    rng = np.random.default_rng(1)
+    for grid_h, grid_w in [(20, 12), (8, 4), (1, 5)]:
+        batch = rng.integers(1, 4, size=(200, grid_h, grid_w))
+        batch[rng.random(batch.shape) < 0.05] = 0
+        cleared, rows_cleared = clear_full_rows(batch)
+        for k in range(len(batch)):
+            expected, expected_rows = reference_clear(batch[k])
+            assert (cleared[k] == expected).all() and rows_cleared[k] == expected_rows
@@ -0,0 +1,26 @@
+################################################################################
+#                                                                              #
+# Tests of the tile counts per exponent and of the highest tile of the grid    #
+# (see Board.exponent_counts and Board.max_exponent).                          #
+#                                                                              #
+################################################################################
+
+import numpy as np
+
+
+# Checks the tile counts and the highest exponent of the board against the
+# tile matrix
+def check_exponent_counts(board):
+    counts = np.bincount(board.exponent_matrix().ravel(), minlength=len(board.exponent_counts))
+    counts[0] = 0
+    assert (np.asarray(board.exponent_counts) == counts).all()
+    assert board.max_exponent == (int(np.flatnonzero(counts)[-1]) if counts.any() else 0)
+
+
+def test_exponent_counts_match_the_tiles_after_every_tick(play_games):
+    play_games(check_exponent_counts)
+
+
+def test_exponent_counts_after_locking_over_a_tile(lock_over_a_tile):
+    board = lock_over_a_tile(check_exponent_counts)
+    assert board.count_tiles(8) == 0 and board.max_tile() == 4
@@ -0,0 +1,53 @@
+################################################################################
+#                                                                              #
+# Tests of the Zobrist hashes of the grids (see the zobrist module).           #
+#                                                                              #
+################################################################################
+
+import numpy as np
+from engine import Board
+from zobrist import grid_key, hash_boards
+
+
+# Checks the hash of the board against the hash of its tiles computed at once
+def check_zobrist(board):
+    assert board.zobrist == int(hash_boards(board.zobrist_keys, board.exponent_matrix()[None])[0])
+
+
+def test_hash_matches_a_full_computation_after_every_tick(play_games):
+    play_games(check_zobrist)
+
+
+def test_hash_after_locking_over_a_tile(lock_over_a_tile):
+    lock_over_a_tile(check_zobrist)
+
+
+def test_empty_grids_of_different_sizes_hash_differently():
+    sizes = [(20, 12), (20, 8), (12, 20), (10, 6), (4, 4)]
+    hashes = [Board(grid_h, grid_w).zobrist for grid_h, grid_w in sizes]
+    assert len(set(hashes)) == len(sizes)
+    assert all(hashes)
+    assert hashes == [grid_key(grid_h, grid_w) for grid_h, grid_w in sizes]
+
+
+def test_reset_and_set_tile_matrix_return_to_the_key_of_the_grid_size():
+    board = Board(6, 4)
+    tiles = np.zeros((6, 4), dtype=int)
+    tiles[0, :3] = [1, 2, 3]
+    board.set_tile_matrix(tiles)
+    assert board.zobrist != grid_key(6, 4)
+    board.set_tile_matrix(np.zeros((6, 4), dtype=int))
+    assert board.zobrist == grid_key(6, 4)
+    board.set_tile_matrix(tiles)
+    board.reset()
+    assert board.zobrist == grid_key(6, 4)
+
+
+def test_doubling_keeps_the_hash_equal_to_a_full_computation():
+    board = Board(6, 4)
+    tiles = np.zeros((6, 4), dtype=int)
+    tiles[0, :3] = [1, 2, 3]
+    board.set_tile_matrix(tiles)
+    for _ in range(5):
+        board.double_tiles_value()
+        check_zobrist(board)
@@ -1,5 +1,8 @@
 import lib.stddraw as stddraw
 from lib.color import Color
+from point import Point
+from engine import EXPONENT_LIMIT
+import numpy as np
 
 
 class Tile:
@@ -7,6 +10,9 @@ class Tile:
     BOUNDARY_THICKNESS = 0.004
     FONT_FAMILY = "Arial"
     BASE_FONT_SIZE = 14
+    # The smallest cell size (in pixels) at which the numbers are drawn when a
+    # whole grid is drawn from its colors (see GameGrid.display_array)
+    MIN_NUMBER_CELL_SIZE = 20
 
     # Dictionary defining visual styles for each tile value
     STYLES = {
@@ -67,9 +73,40 @@ class Tile:
         }
     }
 
+    # Tiles shared by all the cells with the same exponent (see from_exponent)
+    _views = {}
+    # Background colors of the tiles for each empty cell color (see color_table)
+    _color_tables = {}
+
     def __init__(self, number=None):
         self._number = number if number is not None else (2, 4)[hash(str(id(self))) % 2]
 
+    @classmethod
+    def from_exponent(cls, exponent):
+        # The grid only stores the exponent of each tile number (2 ** exponent),
+        # so the tiles used for drawing are created once per exponent and shared
+        exponent = int(exponent)
+        tile = cls._views.get(exponent)
+        if tile is None:
+            tile = cls._views[exponent] = cls(2 ** exponent)
+        return tile
+
+    @classmethod
+    def color_table(cls, empty_color):
+        # The background colors of the tiles as an array of (r, g, b) values
+        # indexed by the exponent of the tile number, with the given color of
+        # the empty cells at index 0, so that the colors of all the cells of a
+        # grid are looked up at once
+        empty = (empty_color.getRed(), empty_color.getGreen(), empty_color.getBlue())
+        table = cls._color_tables.get(empty)
+        if table is None:
+            colors = [empty]
+            for exponent in range(1, EXPONENT_LIMIT):
+                background = cls.from_exponent(exponent)._get_style()['background']
+                colors.append((background.getRed(), background.getGreen(), background.getBlue()))
+            table = cls._color_tables[empty] = np.array(colors, dtype=np.uint8)
+        return table
+
     @property
     def number(self):
         return self._number
@@ -96,6 +133,17 @@ class Tile:
         return max(8, self.BASE_FONT_SIZE - (digits - 1) * 2)
 
     def draw(self, position, length=1):
+        # Copy the sprite of this tile (drawn once per number and size)
+        stddraw.drawSprite(self.sprite(length), position.x, position.y)
+
+    def sprite(self, length=1):
+        # Returns the surface of this tile with the given side length, which is
+        # drawn by draw_shapes the first time it is needed for the tile number
+        # and the cell size in pixels (see stddraw.sprite)
+        return stddraw.sprite(("tile", self.number), length, length,
+                              lambda: self.draw_shapes(Point(0, 0), length))
+
+    def draw_shapes(self, position, length=1):
 
         style = self._get_style()
 
@@ -116,5 +164,13 @@ class Tile:
             stddraw.setFontSize(self._calculate_font_size())
             stddraw.text(position.x, position.y, str(self.number))
 
+    def number_sprite(self):
+        # Returns a surface with the number of this tile drawn as in draw_shapes
+        # (on a transparent background)
+        stddraw.setPenColor(self._get_style()['text'])
+        stddraw.setFontFamily(self.FONT_FAMILY)
+        stddraw.setFontSize(self._calculate_font_size())
+        return stddraw.textSurface(str(self.number))
+
     def __str__(self):
-        return f"Tile({self.number})"
\ No newline at end of file
+        return f"Tile({self.number})"
\ No newline at end of file
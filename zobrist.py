@@ -0,0 +1,116 @@
+################################################################################
+#                                                                              #
+# Zobrist hashing of game states and a transposition table keyed by the        #
+# hashes. The hash of a grid is the XOR of a 64-bit key of the grid size and  #
+# one 64-bit key per occupied cell, where the key of a tile with the exponent  #
+# e is the random key of its cell rotated left by e bits. Doubling every tile  #
+# increments every exponent, so it only rotates the XOR of the tile keys left  #
+# by one bit.                                                                  #
+#                                                                              #
+################################################################################
+
+from collections import OrderedDict  # for the least recently used order
+from functools import lru_cache  # for drawing the key of each grid size once
+import numpy as np  # the fundamental Python module for scientific computing
+
+# the seed of the cell keys (the same on every run, so that the hashes of the
+# grids with the same dimensions can be compared across games and processes)
+ZOBRIST_SEED = 2048
+MASK_64 = (1 << 64) - 1
+
+
+# Returns a random 64-bit key for every cell of a grid with the given size
+def cell_keys(grid_h, grid_w):
+    rng = np.random.default_rng([ZOBRIST_SEED, grid_h, grid_w])
+    return rng.integers(0, 2 ** 64, size=(grid_h, grid_w), dtype=np.uint64, endpoint=False)
+
+
+# Returns the non-zero key of a grid with the given size (the hash of its empty
+# grid), drawn from the same stream right after the cell keys, so that the
+# hashes of grids with different sizes differ
+@lru_cache(maxsize=None)
+def grid_key(grid_h, grid_w):
+    rng = np.random.default_rng([ZOBRIST_SEED, grid_h, grid_w])
+    rng.integers(0, 2 ** 64, size=(grid_h, grid_w), dtype=np.uint64, endpoint=False)
+    return int(rng.integers(0, 2 ** 64, dtype=np.uint64, endpoint=False)) or 1
+
+
+# Returns the XOR of the keys of the tiles with the given cell keys and
+# exponents (arrays of the same shape, all the exponents between 1 and 63)
+def hash_tiles(keys, exponents):
+    keys = np.asarray(keys, dtype=np.uint64)
+    exponents = np.asarray(exponents, dtype=np.uint64)
+    rotated = (keys << exponents) | (keys >> (np.uint64(64) - exponents))
+    return int(np.bitwise_xor.reduce(rotated, axis=None)) if rotated.size else 0
+
+
+# Returns the hash of each grid in a (n, h, w) array of tile exponents (the
+# same value as Board.zobrist for the same tiles, starting from grid_key), for
+# all the grids at once
+def hash_boards(keys, exponents):
+    exponents = np.asarray(exponents).astype(np.uint64)
+    keys = np.broadcast_to(np.asarray(keys, dtype=np.uint64), exponents.shape)
+    rotated = (keys << exponents) | (keys >> (np.uint64(64) - exponents))
+    rotated[exponents == 0] = 0
+    hashes = np.bitwise_xor.reduce(rotated.reshape(len(exponents), -1), axis=1)
+    return hashes ^ np.uint64(grid_key(*exponents.shape[1:]))
+
+
+# Returns the key of a single tile with the given cell key and exponent
+def tile_key(key, exponent):
+    key = int(key)
+    return ((key << exponent) | (key >> (64 - exponent))) & MASK_64
+
+
+# Returns the given hash rotated left by the given number of bits (the hash of
+# the grid after its tiles have been doubled that many times)
+def rotate_hash(value, bits=1):
+    return ((value << bits) | (value >> (64 - bits))) & MASK_64
+
+
+# Returns the key of a falling tetromino of the given type in the given rotation
+# state and position (the splitmix64 mix of these values)
+def piece_key(shape, rotation, x, y):
+    value = (((ord(shape) * 4 + rotation) * 1024 + x + 512) * 1024 + y + 512) & MASK_64
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+# A bounded table of values keyed by the hashes of game states. When the table
+# is full, the least recently used entry is removed.
+class TranspositionTable:
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # Returns the value stored for the given hash (default when there is none)
+    def get(self, key, default=None):
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        return default
+
+    # Stores a value for the given hash
+    def put(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0